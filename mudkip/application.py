@@ -1,23 +1,33 @@
+import json
 import os
 import shutil
-import sys
 import time
 import webbrowser
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import ExitStack, contextmanager, nullcontext
 from io import StringIO
+from pathlib import Path
 
 import tomlkit
-from sphinx.application import Sphinx
-from sphinx.errors import SphinxError
-from sphinx.util import logging
 from tomlkit.toml_file import TOMLFile as BaseTOMLFile
 
+from . import __version__
+from .assets import AssetPipeline
+from .autodoc import ModuleTracker, changed_modules, event_filenames
 from .config import Config
 from .errors import MudkipError
+from .features import (
+    SUFFIX_FEATURES,
+    FeatureDetector,
+    configured_extensions,
+    suffix_features,
+)
+from .fingerprint import FingerprintFile, fingerprint
 from .github import GitHubPagesUpdater
-from .jupyter import jupyter_notebook
+from .notebooks import NotebookCache
 from .npm import NpmDriver, locate_package_json
-from .watch import DirectoryWatcher
+from .profiling import Profiler, instrument
+from .zygote import Zygote, fork_available
 
 
 class TOMLFile(BaseTOMLFile):
@@ -54,8 +64,11 @@ class Mudkip:
         pyproject_file="pyproject.toml",
         mudkip_file="mudkip.toml",
         silence_pandoc_version_warning=True,
+        profile=False,
         **kwargs,
     ):
+        self.profiler = Profiler() if profile else None
+
         pyproject = TOMLFile(pyproject_file)
         mudkip = TOMLFile(mudkip_file)
 
@@ -77,7 +90,28 @@ class Mudkip:
         self.pyproject = pyproject
         self.mudkip = mudkip
 
-        self.create_sphinx_application()
+        self.env_fingerprint = FingerprintFile(
+            config.sphinx_doctreedir / "fingerprint.json"
+        )
+        self.env_components = None
+        self._fresh_env_reason = None
+
+        self.module_tracker = ModuleTracker(config.project_name)
+        self.notebook_cache = NotebookCache(
+            config.output_dir / "notebook_cache",
+            config.notebook_cache_max_age,
+            config.notebook_cache_max_size,
+        )
+
+        self.link_cache_file = config.output_dir / "link_cache.json"
+        self.asset_report = None
+        self.gh_pages_updated = None
+        self.warning_log = None
+
+        self._sphinx = None
+        self._sphinx_namespace = ExitStack()
+        self.features = None
+        self.required_features = set()
 
         package_json_dir = locate_package_json(config)
         self.npm_driver = (
@@ -86,18 +120,35 @@ class Mudkip:
             else None
         )
 
-        if silence_pandoc_version_warning:
-            import nbconvert
+        self.silence_pandoc_version_warning = silence_pandoc_version_warning
 
-            nbconvert.utils.pandoc._maximal_version = None
+    @property
+    def sphinx(self):
+        if self._sphinx is None:
+            with self.phase("setup"):
+                self.create_sphinx_application()
+
+        return self._sphinx
+
+    @property
+    def fresh_env_reason(self):
+        # the saved environment is only inspected when the application is created
+        return self.sphinx and self._fresh_env_reason
 
     def create_sphinx_application(self):
+        from sphinx import __display_version__ as sphinx_version
+        from sphinx.application import ENV_PICKLE_FILENAME, Sphinx
+        from sphinx.util.docutils import docutils_namespace
+
+        from .diagnostics import WarningLog
+
         extra_args = {}
 
         if not self.config.verbose:
             extra_args["status"] = None
 
-        conf = self.config.sphinx_confoverrides
+        # the overrides are left untouched so that the application can be recreated
+        conf = dict(self.config.sphinx_confoverrides)
 
         if self.config.sphinx_project:
             conf.setdefault("project", self.config.sphinx_project)
@@ -135,19 +186,46 @@ class Mudkip:
             ],
         )
 
-        extensions = conf.setdefault("extensions", [])
+        extensions = conf["extensions"] = list(conf.get("extensions", []))
+        # configuring an extension in the override also asks for it
+        explicit = set(extensions) | configured_extensions(conf)
+        detected = self.detect_features(
+            conf["exclude_patterns"], conf.get("source_suffix")
+        )
+        self.features = detected
+
+        def enable(extension, *features):
+            if extension not in explicit:
+                if detected is not None and detected.isdisjoint(features):
+                    return False
+            if extension not in extensions:
+                extensions.append(extension)
+            return True
+
+        if enable("myst_nb", "markdown", "notebooks"):
+            if self.silence_pandoc_version_warning:
+                import nbconvert
 
-        extensions.append("myst_nb")
-        conf.setdefault("nb_execution_mode", "force")
-        conf.setdefault("nb_execution_allow_errors", True)
+                nbconvert.utils.pandoc._maximal_version = None
 
-        extensions.append("sphinx.ext.autodoc")
-        conf.setdefault("autodoc_member_order", "bysource")
-        conf.setdefault("autodoc_typehints", "description")
-        conf.setdefault("autodoc_typehints_description_target", "documented")
+            allow_errors = conf.setdefault("nb_execution_allow_errors", True)
 
-        extensions.append("sphinx.ext.napoleon")
-        extensions.append("sphinx.ext.doctest")
+            if self.config.notebook_cache:
+                conf.setdefault("nb_execution_mode", "cache")
+                conf.setdefault(
+                    "nb_execution_cache_path",
+                    str(self.notebook_cache.path(allow_errors)),
+                )
+            else:
+                conf.setdefault("nb_execution_mode", "force")
+
+        if enable("sphinx.ext.autodoc", "autodoc"):
+            conf.setdefault("autodoc_member_order", "bysource")
+            conf.setdefault("autodoc_typehints", "description")
+            conf.setdefault("autodoc_typehints_description_target", "documented")
+
+        enable("sphinx.ext.napoleon", "autodoc")
+        enable("sphinx.ext.doctest", "doctest")
 
         if self.config.section_label_depth:
             extensions.append("sphinx.ext.autosectionlabel")
@@ -155,36 +233,95 @@ class Mudkip:
                 "autosectionlabel_maxdepth", self.config.section_label_depth
             )
 
-        extensions.append("sphinx.ext.intersphinx")
-        conf.setdefault(
-            "intersphinx_mapping", {"python": ("https://docs.python.org/3", None)}
-        )
+        if enable("sphinx.ext.intersphinx", "autodoc", "python_roles"):
+            conf.setdefault(
+                "intersphinx_mapping", {"python": ("https://docs.python.org/3", None)}
+            )
 
-        extensions.append("sphinxcontrib.mermaid")
+        enable("sphinxcontrib.mermaid", "mermaid")
 
         extensions.append("mudkip.extension")
 
-        self.sphinx = Sphinx(
+        self.env_components = {
+            "mudkip": __version__,
+            "sphinx": sphinx_version,
+            "preset": self.config.preset.name,
+            "builder": self.config.sphinx_buildername,
+            "extensions": extensions,
+            "config": fingerprint(
+                {key: value for key, value in conf.items() if key != "extensions"}
+            ),
+        }
+
+        freshenv = True
+
+        if self.config.persistent_env:
+            pickled_env = self.config.sphinx_doctreedir / ENV_PICKLE_FILENAME
+
+            if not pickled_env.is_file():
+                self._fresh_env_reason = "no saved environment"
+            elif changes := self.env_fingerprint.changes(self.env_components):
+                self._fresh_env_reason = ", ".join(changes)
+            else:
+                freshenv = False
+
+        self.warning_log = WarningLog(self.config.sphinx_doctreedir / "warnings.json")
+
+        # directives and nodes registered by the application are global
+        self._sphinx_namespace.enter_context(docutils_namespace())
+
+        self._sphinx = Sphinx(
             self.config.sphinx_srcdir,
             self.config.sphinx_confdir,
             self.config.sphinx_outdir,
             self.config.sphinx_doctreedir,
             self.config.sphinx_buildername,
             conf,
+            freshenv=freshenv,
+            parallel=self.config.jobs,
             **extra_args,
         )
+        self._sphinx.mudkip_profiler = self.profiler
 
-        self.sphinx._init_env(True)
-        self.sphinx._init_builder()
+    def detect_features(self, exclude_patterns, source_suffix=None):
+        from sphinx.util.matching import Matcher
 
-    @contextmanager
-    def sphinx_warning_is_error(self):
-        try:
-            original_value = self.sphinx.warningiserror
-            self.sphinx.warningiserror = True
-            yield
-        finally:
-            self.sphinx.warningiserror = original_value
+        if not self.config.detect_extensions:
+            return None
+
+        detector = FeatureDetector(
+            self.config.source_dir,
+            self.config.output_dir / "features.json",
+            Matcher(exclude_patterns),
+            suffix_features(source_suffix),
+        )
+
+        return detector.detect(self.required_features)
+
+    def features_added(self):
+        if self.features is None:
+            return False
+
+        detected = self.detect_features(
+            self.sphinx.config.exclude_patterns,
+            self.config.sphinx_confoverrides.get("source_suffix"),
+        )
+
+        return not detected.issubset(self.features)
+
+    def recreate_sphinx_application(self):
+        self._sphinx_namespace.close()
+        self._sphinx = None
+        return self.sphinx
+
+    def setup_extension(self, extension):
+        config = self.sphinx.config
+        self.sphinx.setup_extension(extension)
+
+        # overrides are only applied to the values known when sphinx starts
+        for name, value in config.overrides.items():
+            if name in config.values and name not in config.__dict__:
+                config[name] = value
 
     @contextmanager
     def sphinx_builder(self, buildername):
@@ -192,7 +329,6 @@ class Mudkip:
             original_builder = self.sphinx.builder
             self.sphinx.preload_builder(buildername)
             self.sphinx.builder = self.sphinx.create_builder(buildername)
-            self.sphinx._init_env(False)
             self.sphinx.builder.set_environment(self.sphinx.env)
             self.sphinx.builder.init()
             yield
@@ -201,6 +337,8 @@ class Mudkip:
 
     @contextmanager
     def sphinx_mute(self):
+        from sphinx.util import logging
+
         try:
             original_status = self.sphinx._status
             original_warning = self.sphinx._warning
@@ -217,12 +355,24 @@ class Mudkip:
     def sphinx_config(self, **kwargs):
         not_present = object()
         conf = self.sphinx.config
+        env = self.sphinx.env
+
+        # myst-nb reads its configuration once when the builder is initialized
+        nb_config = getattr(env, "mystnb_config", None)
+        nb_values = {}
+
+        if nb_config:
+            nb_values = {
+                key[3:]: kwargs.pop(key) for key in list(kwargs) if key[:3] == "nb_"
+            }
 
         try:
             original_values = {}
             for key, value in kwargs.items():
                 original_values[key] = getattr(conf, key, not_present)
                 setattr(conf, key, value)
+            if nb_values:
+                env.mystnb_config = nb_config.copy(**nb_values)
             yield
         finally:
             for key, value in original_values.items():
@@ -230,6 +380,8 @@ class Mudkip:
                     delattr(conf, key)
                 else:
                     setattr(conf, key, value)
+            if nb_config:
+                env.mystnb_config = nb_config
 
     def init(self, title=None):
         table = tomlkit.table()
@@ -283,50 +435,199 @@ class Mudkip:
         if not index_rst.is_file() and not index_md.is_file():
             index_rst.write_text(f"{title}\n{'=' * len(title)}\n")
 
-    def build(self, *, check=False, skip_broken_links=False, update_gh_pages=False):
-        self.delete_autodoc_cache()
+    def build(
+        self,
+        *,
+        check=False,
+        skip_broken_links=False,
+        recheck_links=False,
+        update_gh_pages=False,
+        optimize_assets=False,
+        event_batch=None,
+    ):
+        from sphinx.errors import SphinxError
+
+        filenames = event_batch and event_filenames(event_batch)
+
+        with self.phase("autodoc cache"):
+            self.delete_autodoc_cache(filenames)
+
+        if event_batch and self.config.project_dir:
+            self.sphinx.mudkip_changed_modules = changed_modules(
+                event_batch, self.config.project_dir
+            )
+
+        if filenames:
+            self.sphinx.mudkip_outdated_docs = {
+                docname
+                for filename in filenames
+                if (docname := self.sphinx.env.path2doc(filename))
+            }
 
         if update_gh_pages:
-            self.sphinx.setup_extension("sphinx.ext.githubpages")
+            self.setup_extension("sphinx.ext.githubpages")
+
+        self.sphinx.mudkip_written_docs = set()
+
+        strict = {}
+
+        if check and "myst_nb" in self.sphinx.extensions:
+            strict["nb_execution_allow_errors"] = False
+            cache_path = str(self.notebook_cache.path())
+            if self.sphinx.config.nb_execution_cache_path == cache_path:
+                path = self.notebook_cache.path(allow_errors=False)
+                strict["nb_execution_cache_path"] = str(path)
 
         try:
+            with self.warning_log.record(self.sphinx, strict=check):
+                with self.sphinx_config(**strict):
+                    self.sphinx_build()
+                    if not self.sphinx.mudkip_written_docs:
+                        self.copy_static_files()
+
+            if self.config.persistent_env:
+                self.env_fingerprint.write(self.env_components)
+
             if check:
-                self.clean()
-                os.makedirs(self.sphinx.outdir, exist_ok=True)
+                if warnings := self.warning_log.warnings(self.sphinx):
+                    raise MudkipError("\n".join(warnings))
 
-                with self.sphinx_warning_is_error():
-                    with self.sphinx_config(nb_execution_allow_errors=False):
-                        self.sphinx.build()
+                if not skip_broken_links:
+                    with self.phase("link check"):
+                        broken_links = self.check_links(recheck_links)
 
-                        if not skip_broken_links:
-                            with self.sphinx_builder("linkcheck"):
-                                self.sphinx.build()
-            else:
-                self.sphinx.build()
+                    # sphinx already reported each of them
+                    if count := len(broken_links):
+                        plural = "s" if count > 1 else ""
+                        raise MudkipError(f"Found {count} broken link{plural}.")
         except SphinxError as exc:
             raise MudkipError(exc.args[0]) from exc
+        finally:
+            self.sphinx.mudkip_changed_modules = set()
+            self.sphinx.mudkip_outdated_docs = set()
+
+        if self.config.notebook_cache and "myst_nb" in self.sphinx.extensions:
+            with self.phase("notebook cache"):
+                self.notebook_cache.prune()
+
+        if optimize_assets and self.sphinx.builder.format == "html":
+            with self.phase("asset optimization"):
+                self.asset_report = AssetPipeline(
+                    self.sphinx.outdir,
+                    self.config.output_dir / "asset_cache",
+                    self.config.fingerprint_assets,
+                    self.config.jobs,
+                ).run()
 
         if self.npm_driver:
-            self.npm_driver.build()
+            with self.phase("npm"):
+                self.npm_driver.build()
 
         if update_gh_pages:
-            GitHubPagesUpdater(self.sphinx.outdir, self.config.repository).update()
+            clone_dir = self.config.incremental_gh_pages and (
+                self.config.output_dir / "gh-pages"
+            )
+            with self.phase("github pages"):
+                self.gh_pages_updated = GitHubPagesUpdater(
+                    self.sphinx.outdir,
+                    self.config.repository,
+                    clone_dir,
+                    self.config.gh_pages_depth,
+                ).update()
+
+    def phase(self, name):
+        return self.profiler.span(name) if self.profiler else nullcontext()
+
+    def sphinx_build(self):
+        with self.phase("sphinx"):
+            if not self.profiler:
+                self.sphinx.build()
+                return
 
-    def delete_autodoc_cache(self):
-        if not self.config.project_name:
+            with instrument(self.profiler, self.sphinx):
+                self.sphinx.build()
+
+    def copy_static_files(self):
+        # sphinx skips the files copied by finish() when no document is outdated
+        builder = self.sphinx.builder
+
+        if not hasattr(builder, "copy_static_files"):
             return
 
-        modules = [
-            mod
-            for mod in sys.modules
-            if mod == self.config.project_name
-            or mod.startswith(self.config.project_name + ".")
+        with self.phase("static files"):
+            builder.prepare_writing(set())
+            builder.copy_static_files()
+            builder.copy_extra_files()
+
+    def write_profile(self):
+        return self.profiler.write(self.config.output_dir / "profile")
+
+    def check_links(self, recheck=False):
+        from .linkcheck import LinkCache
+
+        if self.config.link_cache:
+            self.sphinx.mudkip_link_cache = LinkCache(
+                self.link_cache_file, self.config.link_cache_ttl, recheck
+            )
+
+        self.sphinx.mudkip_link_host_workers = self.config.link_host_workers
+
+        # broken links are reported afterwards so that a failing check doesn't
+        # make sphinx discard the environment
+        try:
+            with self.sphinx_builder("linkcheck"):
+                self.sphinx_build()
+                output = Path(self.sphinx.builder.outdir) / "output.json"
+        finally:
+            self.sphinx.mudkip_link_cache = None
+
+        if not output.is_file():
+            return []
+
+        results = map(json.loads, output.read_text("utf-8").splitlines())
+        return [result["uri"] for result in results if result["status"] == "broken"]
+
+    def pending_notebooks(self):
+        env = self.sphinx.env
+        return [
+            env.doc2path(docname) for docname in self.sphinx.mudkip_pending_notebooks
         ]
 
-        for mod in modules:
-            del sys.modules[mod]
+    def changed_pages(self, event_batch=None):
+        builder = self.sphinx.builder
 
-    def develop(
+        if not hasattr(builder, "get_outfilename"):
+            return None
+
+        filenames = event_batch and event_filenames(event_batch) or ()
+        sources = (".py", ".pyi", ".pyx")
+        path2doc = self.sphinx.env.path2doc
+
+        # anything other than a document or a module could affect every page
+        for filename in filenames:
+            if not filename.endswith(sources) and not path2doc(filename):
+                return None
+
+        return sorted(
+            Path(builder.get_outfilename(docname))
+            .relative_to(self.sphinx.outdir)
+            .as_posix()
+            for docname in self.sphinx.mudkip_written_docs
+        )
+
+    def reload_environment(self):
+        self.sphinx.env = self.sphinx._init_env(False)
+        self.sphinx._post_init_env()
+        self.sphinx.builder.set_environment(self.sphinx.env)
+
+    def delete_autodoc_cache(self, filenames=None):
+        if not self.config.project_name:
+            return
+
+        self.module_tracker.invalidate(filenames)
+
+    @contextmanager
+    def development_session(
         self,
         open_browser=False,
         host="localhost",
@@ -334,26 +635,132 @@ class Mudkip:
         notebook=False,
         notebook_host="localhost",
         notebook_port=8888,
-        build_manager=None,
+        fork=False,
+        polling=False,
     ):
-        if not build_manager:
-            build_manager = lambda *args: nullcontext()
+        from .watch import DirectoryWatcher
+
+        if fork and not fork_available():
+            raise MudkipError("Forking is not supported on this platform.")
+
+        zygote = None
+        executor = None
+        dev_server = None
+        tracker = self.module_tracker
+
+        def configure_sphinx():
+            if executor:
+                self.sphinx.mudkip_notebook_executor = executor
+            elif "myst_nb" in self.sphinx.extensions:
+                stack.enter_context(self.sphinx_config(nb_execution_mode="auto"))
+
+        def update_sphinx():
+            # a new kind of source file can require an extension that isn't loaded
+            if self.features_added():
+                self.recreate_sphinx_application()
+                configure_sphinx()
+                return True
+            return False
+
+        def forked_build(event_batch=None, failed=None, imports=None):
+            if executor:
+                executor.failed = failed
+            tracker.imports = imports
+            if event_batch is not None and not update_sphinx():
+                self.reload_environment()
+            self.build(event_batch=event_batch)
+            state = tracker.imports, tracker.reloaded, tracker.kept
+            return self.pending_notebooks(), self.changed_pages(event_batch), state
+
+        def build(event_batch=None):
+            if zygote:
+                failed = executor.failures() if executor else None
+                pending, pages, state = zygote.run(event_batch, failed, tracker.imports)
+                tracker.imports, tracker.reloaded, tracker.kept = state
+            else:
+                if event_batch is not None:
+                    update_sphinx()
+                self.build(event_batch=event_batch)
+                pending = self.pending_notebooks()
+                pages = self.changed_pages(event_batch)
+
+            if executor:
+                executor.submit(pending)
 
-        patterns = [f"*{suff}" for suff in self.sphinx.config.source_suffix]
+            if dev_server and event_batch is not None and pages != []:
+                dev_server.reload(pages)
+
+        # suffixes handled by extensions that aren't loaded yet are watched too
+        suffixes = dict.fromkeys([*self.sphinx.config.source_suffix, *SUFFIX_FEATURES])
+        patterns = [f"*{suff}" for suff in suffixes]
         ignore_patterns = self.sphinx.config.exclude_patterns
 
         patterns += ["*.py", "*.pyi", "*.pyx", "*.js", "*.html", "*.css", "*.png"]
 
-        dirs = [self.config.source_dir]
+        keep_dirs = [
+            os.path.join(self.sphinx.confdir, path)
+            for path in self.sphinx.config.html_static_path
+            + self.sphinx.config.templates_path
+        ]
+
+        watcher = DirectoryWatcher(
+            directories=[self.config.source_dir],
+            patterns=patterns,
+            ignore_patterns=ignore_patterns,
+            output_directory=self.config.output_dir,
+            keep_directories=keep_dirs,
+            polling=polling,
+        )
 
         if self.config.project_dir:
-            dirs.append(self.config.project_dir)
+            # only the patterns that aren't anchored to the source directory
+            watcher.watch(
+                self.config.project_dir,
+                [pattern for pattern in ignore_patterns if pattern.startswith("**/")],
+            )
+
+        conf = self.sphinx.config
+        notebooks = "myst_nb" in self.sphinx.extensions
 
         with ExitStack() as stack:
-            stack.enter_context(self.sphinx_config(nb_execution_mode="auto"))
+            if (
+                notebooks
+                and self.config.notebook_workers
+                and self.config.notebook_cache
+                and conf.nb_execution_mode == "cache"
+            ):
+                from .kernels import NotebookExecutor
+
+                executor = stack.enter_context(
+                    NotebookExecutor(
+                        conf.nb_execution_cache_path,
+                        self.config.notebook_workers,
+                        conf.nb_execution_timeout,
+                        conf.nb_execution_allow_errors,
+                        on_executed=watcher.notify,
+                    )
+                )
+
+            configure_sphinx()
+
+            # forking a process that already runs threads isn't safe, so rebuilds
+            # are forked from a separate process started before any of them
+            if fork:
+                zygote = stack.enter_context(
+                    Zygote(
+                        forked_build,
+                        self.config.project_name,
+                        self.config.preload_modules,
+                    )
+                )
+
+            if executor:
+                executor.pool.prewarm("python3", str(self.config.source_dir.resolve()))
 
             notebook_url = None
             if notebook:
+                from .jupyter import jupyter_notebook
+
                 notebook_url = stack.enter_context(
                     jupyter_notebook(
                         str(self.config.source_dir),
@@ -365,10 +772,16 @@ class Mudkip:
 
             server_url = None
             if self.config.dev_server:
-                server_url = stack.enter_context(
+                dev_server = stack.enter_context(
                     self.config.dev_server(self.sphinx.outdir, host, port)
                 )
 
+                # servers that only yield their url reload pages on their own
+                if isinstance(dev_server, str):
+                    server_url, dev_server = dev_server, None
+                else:
+                    server_url = dev_server.url
+
                 if open_browser:
                     try:
                         webbrowser.open(server_url)
@@ -380,20 +793,83 @@ class Mudkip:
             if self.npm_driver:
                 stack.enter_context(self.npm_driver.develop())
 
+            yield watcher, build, server_url, notebook_url
+
+    def develop(
+        self,
+        open_browser=False,
+        host="localhost",
+        port=5500,
+        notebook=False,
+        notebook_host="localhost",
+        notebook_port=8888,
+        build_manager=None,
+        fork=False,
+        polling=False,
+    ):
+        if not build_manager:
+            build_manager = lambda *args, **kwargs: nullcontext()
+
+        with self.development_session(
+            open_browser,
+            host,
+            port,
+            notebook,
+            notebook_host,
+            notebook_port,
+            fork,
+            polling,
+        ) as (watcher, build, server_url, notebook_url):
             with build_manager(server_url=server_url, notebook_url=notebook_url):
-                self.build()
+                build()
 
-            for event_batch in DirectoryWatcher(
-                directories=dirs,
-                patterns=patterns,
-                ignore_patterns=ignore_patterns,
-                output_directory=self.config.output_dir,
-            ):
+            for event_batch in watcher:
                 with build_manager(event_batch):
-                    self.build()
+                    build(event_batch)
+
+    async def develop_async(
+        self,
+        open_browser=False,
+        host="localhost",
+        port=5500,
+        notebook=False,
+        notebook_host="localhost",
+        notebook_port=8888,
+        build_manager=None,
+        fork=False,
+        polling=False,
+    ):
+        import asyncio
+
+        if not build_manager:
+            build_manager = lambda *args, **kwargs: nullcontext()
+
+        loop = asyncio.get_running_loop()
+
+        with ThreadPoolExecutor(1) as builder, self.development_session(
+            open_browser,
+            host,
+            port,
+            notebook,
+            notebook_host,
+            notebook_port,
+            fork,
+            polling,
+        ) as (watcher, build, server_url, notebook_url):
+            with build_manager(server_url=server_url, notebook_url=notebook_url):
+                await loop.run_in_executor(builder, build)
+
+            async for event_batch in watcher:
+                with build_manager(event_batch):
+                    await loop.run_in_executor(builder, build, event_batch)
 
     def test(self):
-        with self.sphinx_builder("doctest"):
+        if self._sphinx is None:
+            self.required_features.add("doctest")
+        elif "sphinx.ext.doctest" not in self.sphinx.extensions:
+            self.setup_extension("sphinx.ext.doctest")
+
+        with self.phase("test"), self.sphinx_builder("doctest"):
             with nullcontext() if self.config.verbose else self.sphinx_mute():
                 self.build()
 
@@ -0,0 +1,290 @@
+import gzip
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+OPTIMIZED_SUFFIXES = {".html", ".css", ".js", ".json", ".svg", ".xml", ".txt"}
+FINGERPRINTED_SUFFIXES = {".css", ".js"}
+
+# minified pages can have unquoted attributes
+STATIC_REFERENCE_REGEX = re.compile(
+    r"""((?:href|src)=["']?[^"'\s>]*?_static/)([^"'\s>?#]+)"""
+)
+FINGERPRINT_REGEX = re.compile(r"^(.*)\.[0-9a-f]{8}(\.[a-z]+)$")
+HASHED_NAME_REGEX = re.compile(r"\.[0-9a-f]{8,}\.[a-z]+$")
+
+
+def minify(suffix, content):
+    try:
+        if suffix == ".html":
+            import minify_html
+
+            return minify_html.minify(
+                content.decode("utf-8"),
+                keep_closing_tags=True,
+                keep_html_and_head_opening_tags=True,
+                minify_css=True,
+                minify_js=True,
+            ).encode("utf-8")
+        elif suffix == ".css":
+            import rcssmin
+
+            return rcssmin.cssmin(content)
+        elif suffix == ".js":
+            import rjsmin
+
+            return rjsmin.jsmin(content)
+    except (ImportError, UnicodeDecodeError):
+        pass
+
+    return content
+
+
+def optimize(suffix, content):
+    minified = minify(suffix, content)
+    compressed = {}
+
+    if len(minified) >= 256:
+        compressed[".gz"] = gzip.compress(minified, 9, mtime=0)
+        if brotli:
+            compressed[".br"] = brotli.compress(minified)
+
+    return minified, {
+        ext: data for ext, data in compressed.items() if len(data) < len(minified)
+    }
+
+
+class AssetCache:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def path(self, key):
+        return self.directory / key[:2] / key
+
+    def get(self, key):
+        path = self.path(key)
+
+        try:
+            meta = json.loads(path.with_suffix(".json").read_text())
+            minified = path.read_bytes()
+            compressed = {ext: path.with_suffix(ext).read_bytes() for ext in meta}
+        except (OSError, ValueError):
+            return None
+
+        return minified, compressed
+
+    def add(self, key, minified, compressed):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        path.write_bytes(minified)
+        for ext, data in compressed.items():
+            path.with_suffix(ext).write_bytes(data)
+        path.with_suffix(".json").write_text(json.dumps(sorted(compressed)))
+
+    def prune(self, keys):
+        if not self.directory.is_dir():
+            return
+
+        for path in self.directory.glob("*/*"):
+            if path.stem not in keys:
+                path.unlink()
+
+
+class AssetPipeline:
+    def __init__(self, output_dir, cache_dir, fingerprint=True, workers=None):
+        self.output_dir = Path(output_dir)
+        self.cache = AssetCache(Path(cache_dir) / "objects")
+        self.manifest_file = Path(cache_dir) / "manifest.json"
+        self.fingerprint = fingerprint
+        self.workers = workers
+
+        try:
+            data = json.loads(self.manifest_file.read_text())
+        except (OSError, ValueError):
+            data = {}
+
+        self.files = data.get("files", {})
+        self.fingerprints = data.get("fingerprints", {})
+
+        self.processed = 0
+        self.cached = 0
+
+    def save(self):
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.manifest_file.with_name(self.manifest_file.name + ".tmp")
+        data = {"files": self.files, "fingerprints": self.fingerprints}
+        temporary.write_text(json.dumps(data))
+        os.replace(temporary, self.manifest_file)
+
+    def collect(self):
+        generated = {
+            f"_static/{fingerprinted}" for fingerprinted in self.fingerprints.values()
+        }
+        assets = []
+
+        for path in self.output_dir.rglob("*"):
+            relative = path.relative_to(self.output_dir).as_posix()
+            if (
+                path.suffix in OPTIMIZED_SUFFIXES
+                and relative not in generated
+                and path.is_file()
+            ):
+                assets.append(relative)
+
+        return sorted(assets)
+
+    def unchanged(self, relative):
+        entry = self.files.get(relative)
+
+        try:
+            stat = (self.output_dir / relative).stat()
+        except OSError:
+            return False
+
+        return entry and entry[:2] == [stat.st_mtime_ns, stat.st_size]
+
+    def rewrite_references(self, content):
+        def replace(match):
+            name = match[2]
+
+            if m := FINGERPRINT_REGEX.match(name):
+                if m[1] + m[2] in self.fingerprints:
+                    name = m[1] + m[2]
+
+            return match[1] + self.fingerprints.get(name, name)
+
+        text = content.decode("utf-8", "surrogateescape")
+        return STATIC_REFERENCE_REGEX.sub(replace, text).encode(
+            "utf-8", "surrogateescape"
+        )
+
+    def process(self, pool, relatives, rewrite=False):
+        results = {}
+        pending = {}
+
+        for relative in relatives:
+            path = self.output_dir / relative
+            content = path.read_bytes()
+
+            if rewrite:
+                content = self.rewrite_references(content)
+
+            key = sha256(content).hexdigest()
+            size = len(content)
+
+            if cached := self.cache.get(key):
+                self.cached += 1
+                results[relative] = key, size, cached
+            else:
+                future = pool.submit(optimize, path.suffix, content)
+                pending[relative] = key, size, future
+
+        for relative, (key, size, future) in pending.items():
+            minified, compressed = future.result()
+            self.cache.add(key, minified, compressed)
+            self.processed += 1
+            results[relative] = key, size, (minified, compressed)
+
+        for relative, (key, size, (minified, compressed)) in results.items():
+            path = self.output_dir / relative
+            path.write_bytes(minified)
+
+            for ext in (".gz", ".br"):
+                sibling = path.with_name(path.name + ext)
+                if ext in compressed:
+                    sibling.write_bytes(compressed[ext])
+                elif sibling.exists():
+                    sibling.unlink()
+
+            stat = path.stat()
+            sizes = [size, len(minified)] + [
+                len(compressed.get(ext, minified)) for ext in (".gz", ".br")
+            ]
+            self.files[relative] = [stat.st_mtime_ns, stat.st_size, key] + sizes
+
+    def write_fingerprints(self, relatives):
+        previous = self.fingerprints
+        self.fingerprints = {}
+
+        for relative in relatives:
+            path = self.output_dir / relative
+            digest = self.files[relative][2][:8]
+            name = relative[len("_static/") :]
+            stem, _, suffix = name.rpartition(".")
+            fingerprinted = f"{stem}.{digest}.{suffix}"
+            self.fingerprints[name] = fingerprinted
+
+            target = self.output_dir / "_static" / fingerprinted
+            for ext in ("", ".gz", ".br"):
+                source = path.with_name(path.name + ext)
+                destination = target.with_name(target.name + ext)
+                if source.exists():
+                    destination.write_bytes(source.read_bytes())
+                elif destination.exists():
+                    destination.unlink()
+
+        for name, fingerprinted in previous.items():
+            if self.fingerprints.get(name) != fingerprinted:
+                for ext in ("", ".gz", ".br"):
+                    stale = self.output_dir / "_static" / (fingerprinted + ext)
+                    if stale.exists():
+                        stale.unlink()
+
+        return previous != self.fingerprints
+
+    def run(self):
+        assets = self.collect()
+
+        static = [
+            relative
+            for relative in assets
+            if self.fingerprint
+            and relative.startswith("_static/")
+            and Path(relative).suffix in FINGERPRINTED_SUFFIXES
+            and not HASHED_NAME_REGEX.search(relative)
+        ]
+        pages = [relative for relative in assets if relative.endswith(".html")]
+        others = [relative for relative in assets if relative not in pages]
+
+        with ProcessPoolExecutor(self.workers) as pool:
+            self.process(pool, [r for r in others if not self.unchanged(r)])
+
+            fingerprints_changed = self.fingerprint and self.write_fingerprints(static)
+
+            # pages refer to fingerprinted assets and need to be updated when they change
+            self.process(
+                pool,
+                [r for r in pages if fingerprints_changed or not self.unchanged(r)],
+                rewrite=self.fingerprint,
+            )
+
+        existing = set(assets)
+        self.files = {r: entry for r, entry in self.files.items() if r in existing}
+        self.cache.prune({entry[2] for entry in self.files.values()})
+        self.save()
+
+        return self.report()
+
+    def report(self):
+        original, minified, gzipped, brotli_size = (
+            sum(entry[i] for entry in self.files.values()) for i in range(3, 7)
+        )
+
+        return {
+            "files": len(self.files),
+            "processed": self.processed,
+            "cached": self.cached,
+            "original": original,
+            "minified": minified,
+            "gzip": gzipped,
+            "brotli": brotli_size if brotli else None,
+        }
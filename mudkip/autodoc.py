@@ -0,0 +1,215 @@
+import ast
+import os
+import sys
+from pathlib import Path
+
+PYTHON_SUFFIXES = (".py", ".pyi", ".pyx")
+
+
+def module_name(filename, project_dir):
+    path = Path(filename).resolve()
+    root = Path(project_dir).resolve().parent
+
+    if path.suffix not in PYTHON_SUFFIXES:
+        return None
+
+    try:
+        parts = list(path.relative_to(root).with_suffix("").parts)
+    except ValueError:
+        return None
+
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+
+    return ".".join(parts) or None
+
+
+def changed_modules(event_batch, project_dir):
+    modules = set()
+
+    for event in event_batch.all_events:
+        for filename in (event.src_path, getattr(event, "dest_path", None)):
+            if filename and (name := module_name(filename, project_dir)):
+                modules.add(name)
+
+    return modules
+
+
+def event_filenames(event_batch):
+    return {
+        filename
+        for event in event_batch.all_events
+        for filename in (event.src_path, getattr(event, "dest_path", None))
+        if filename
+    }
+
+
+class ModuleTracker:
+    def __init__(self, project_name):
+        self.project_name = project_name
+        self.imports = {}
+        self.kept = 0
+        self.reloaded = 0
+
+    def project_modules(self):
+        return {
+            name: module
+            for name, module in list(sys.modules.items())
+            if module is not None
+            and (name == self.project_name or name.startswith(self.project_name + "."))
+        }
+
+    def module_file(self, module):
+        filename = getattr(module, "__file__", None)
+        return filename and os.path.realpath(filename)
+
+    def dependencies(self, name, module, modules):
+        filename = self.module_file(module)
+
+        if not filename or not filename.endswith(".py"):
+            return set()
+
+        try:
+            mtime = os.stat(filename).st_mtime_ns
+        except OSError:
+            return set()
+
+        cached_mtime, imported = self.imports.get(filename, (None, None))
+
+        if cached_mtime != mtime:
+            imported = self.parse_imports(name, filename, hasattr(module, "__path__"))
+            self.imports[filename] = mtime, imported
+
+        dependencies = set()
+
+        for base, names in imported:
+            submodules = {f"{base}.{alias}" for alias in names}.intersection(modules)
+            dependencies.update(submodules)
+            if len(submodules) < len(names) or not names:
+                dependencies.add(base)
+
+        return dependencies.intersection(modules)
+
+    def parse_imports(self, name, filename, is_package):
+        try:
+            tree = ast.parse(Path(filename).read_bytes(), filename)
+        except (OSError, SyntaxError, ValueError):
+            return []
+
+        package = name if is_package else name.rpartition(".")[0]
+        imported = []
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                imported.extend((alias.name, ()) for alias in node.names)
+
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    base = package.split(".")
+                    base = base[: len(base) - node.level + 1]
+                    base = ".".join(base + ([node.module] if node.module else []))
+                else:
+                    base = node.module
+
+                imported.append((base, [alias.name for alias in node.names]))
+
+        return imported
+
+    def invalidate(self, filenames=None):
+        modules = self.project_modules()
+
+        if filenames is None:
+            evicted = set(modules)
+        else:
+            filenames = {os.path.realpath(filename) for filename in filenames}
+            evicted = {
+                name
+                for name, module in modules.items()
+                if self.module_file(module) in filenames
+            }
+
+            importers = {}
+            for name, module in modules.items():
+                for dependency in self.dependencies(name, module, modules):
+                    importers.setdefault(dependency, set()).add(name)
+
+            pending = list(evicted)
+            while pending:
+                for importer in importers.get(pending.pop(), ()):
+                    if importer not in evicted:
+                        evicted.add(importer)
+                        pending.append(importer)
+
+        for name in evicted:
+            del sys.modules[name]
+
+        self.reloaded = len(evicted)
+        self.kept = len(modules) - len(evicted)
+
+
+def documented_modules(name, obj):
+    modules = set()
+
+    if module := getattr(obj, "__module__", None):
+        modules.add(module)
+
+    parts = name.split(".")
+
+    while parts:
+        prefix = ".".join(parts)
+        if prefix in sys.modules:
+            modules.add(prefix)
+            break
+        parts.pop()
+
+    return modules
+
+
+def init_autodoc_index(app):
+    if not hasattr(app.env, "mudkip_autodoc_index"):
+        app.env.mudkip_autodoc_index = {}
+
+
+def record_autodoc_modules(app, what, name, obj, options, lines):
+    index = app.env.mudkip_autodoc_index
+    index.setdefault(app.env.docname, set()).update(documented_modules(name, obj))
+
+
+def purge_autodoc_modules(app, env, docname):
+    env.mudkip_autodoc_index.pop(docname, None)
+
+
+def merge_autodoc_modules(app, env, docnames, other):
+    for docname in docnames:
+        if docname in other.mudkip_autodoc_index:
+            env.mudkip_autodoc_index[docname] = other.mudkip_autodoc_index[docname]
+
+
+def outdated_autodoc_documents(app, env, added, changed, removed):
+    modules = app.mudkip_changed_modules
+
+    if not modules:
+        return []
+
+    outdated = {
+        docname
+        for docname, documented in env.mudkip_autodoc_index.items()
+        if not modules.isdisjoint(documented)
+    }
+
+    for parent, children in env.toctree_includes.items():
+        if outdated.intersection(children):
+            outdated.add(parent)
+
+    return outdated
+
+
+def setup_autodoc_index(app):
+    app.mudkip_changed_modules = set()
+
+    app.connect("builder-inited", init_autodoc_index)
+    if "sphinx.ext.autodoc" in app.extensions:
+        app.connect("autodoc-process-docstring", record_autodoc_modules)
+    app.connect("env-purge-doc", purge_autodoc_modules)
+    app.connect("env-merge-info", merge_autodoc_modules)
+    app.connect("env-get-outdated", outdated_autodoc_documents)
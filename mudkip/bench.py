@@ -0,0 +1,634 @@
+import http.client
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from statistics import median
+
+from . import __version__
+
+BENCHMARKS = (
+    "startup",
+    "build",
+    "edit",
+    "vitepress",
+    "markdown",
+    "server",
+    "events",
+    "polling",
+)
+
+PACKAGE = "benchpkg"
+
+
+def module_source(index, classes=5, functions=5):
+    lines = [f'"""Module {index} of the benchmark package."""', ""]
+
+    for i in range(functions):
+        lines += [
+            f"def function{i}(value, factor=2):",
+            '    """Multiply a value.',
+            "",
+            "    Parameters",
+            "    ----------",
+            "    value : int",
+            "        The value to multiply.",
+            "    factor : int",
+            "        The multiplier.",
+            "",
+            "    Returns",
+            "    -------",
+            "    int",
+            "        The result.",
+            '    """',
+            "    return value * factor",
+            "",
+            "",
+        ]
+
+    for i in range(classes):
+        lines += [f"class Class{i}:", f'    """Class {i} of module {index}."""', ""]
+        for j in range(4):
+            see = f":func:`function{j % functions}`" if functions else "the module"
+            lines += [
+                f"    def method{j}(self, argument):",
+                f'        """Return the argument, see {see}."""',
+                "        return argument",
+                "",
+            ]
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+def page_source(index, modules, markdown=False):
+    module = f"{PACKAGE}.module{index % modules}" if modules else None
+
+    if markdown:
+        text = [f"# Page {index}", ""]
+        for section in range(5):
+            text += [
+                f"## Section {section}",
+                "",
+                f"Paragraph {section} of page {index} with *emphasis*, **strong** "
+                "text and `inline code`.",
+                "",
+                "- first item",
+                "- second item",
+                "",
+                "```python",
+                f"print({index} + {section})",
+                "```",
+                "",
+            ]
+        if module:
+            text += [f"See {{py:func}}`{module}.function0`.", ""]
+        return "\n".join(text)
+
+    text = [f"Page {index}", "=" * (len(str(index)) + 5), ""]
+    for section in range(5):
+        title = f"Section {section}"
+        text += [
+            title,
+            "-" * len(title),
+            "",
+            f"Paragraph {section} of page {index} with *emphasis*, **strong** "
+            "text and ``inline code``.",
+            "",
+            "- first item",
+            "- second item",
+            "",
+            ".. code-block:: python",
+            "",
+            f"   print({index} + {section})",
+            "",
+            ".. note::",
+            "",
+            "   An admonition.",
+            "",
+        ]
+    if module:
+        text += [f"See :func:`{module}.function0`.", ""]
+    return "\n".join(text)
+
+
+def notebook_source(index):
+    sources = [
+        ("markdown", f"# Notebook {index}"),
+        ("code", f"value = {index}"),
+        ("code", "print(value * 2)"),
+    ]
+
+    cells = []
+    for i, (cell_type, source) in enumerate(sources):
+        cell = {"cell_type": cell_type, "id": f"cell-{i}", "metadata": {}}
+        if cell_type == "code":
+            cell.update(execution_count=None, outputs=[])
+        cell["source"] = source
+        cells.append(cell)
+
+    notebook = {
+        "cells": cells,
+        "metadata": {
+            "kernelspec": {
+                "display_name": "Python 3",
+                "language": "python",
+                "name": "python3",
+            }
+        },
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }
+
+    return json.dumps(notebook, indent=1)
+
+
+def generate_project(directory, pages=50, notebooks=2, modules=10, members=200):
+    directory = Path(directory)
+    docs = directory / "docs"
+    package = directory / PACKAGE
+
+    if directory.exists():
+        shutil.rmtree(directory)
+
+    for path in (docs / "pages", docs / "api", docs / "notebooks", package):
+        path.mkdir(parents=True)
+
+    (directory / "mudkip.toml").write_text(
+        f'[mudkip]\npreset = "alabaster"\nproject_name = "{PACKAGE}"\n'
+        'title = "Benchmark"\n'
+    )
+
+    (package / "__init__.py").write_text("")
+    for i in range(modules):
+        (package / f"module{i}.py").write_text(module_source(i))
+    (package / "large.py").write_text(module_source("large", 0, members))
+
+    (docs / "index.rst").write_text(
+        "Benchmark\n=========\n\n"
+        ".. toctree::\n   :glob:\n\n   pages/*\n   api/*\n   notebooks/*\n"
+    )
+
+    for i in range(pages):
+        markdown = i % 2 == 1
+        suffix = ".md" if markdown else ".rst"
+        page = docs / "pages" / f"page{i}{suffix}"
+        page.write_text(page_source(i, modules, markdown))
+
+    for name in [f"module{i}" for i in range(modules)] + ["large"]:
+        title = f"{PACKAGE}.{name}"
+        (docs / "api" / f"{name}.rst").write_text(
+            f"{title}\n{'=' * len(title)}\n\n.. automodule:: {title}\n   :members:\n"
+        )
+
+    for i in range(notebooks):
+        (docs / "notebooks" / f"notebook{i}.ipynb").write_text(notebook_source(i))
+
+    return directory
+
+
+def subprocess_env():
+    root = str(Path(__file__).resolve().parent.parent)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    return env
+
+
+def time_command(command, cwd):
+    start = time.perf_counter()
+    subprocess.run(
+        command, cwd=cwd, env=subprocess_env(), check=True, capture_output=True
+    )
+    return time.perf_counter() - start
+
+
+def run_build(project, *args, output_dir="docs/_build"):
+    command = [sys.executable, "-m", "mudkip", "build", "--profile", *args]
+    result = {"wall": time_command(command, project)}
+
+    profile = json.loads(
+        (project / output_dir / "profile" / "profile.json").read_text()
+    )
+    for phase in profile["phases"]:
+        result[phase["name"]] = phase["wall"]
+
+    return result
+
+
+@contextmanager
+def working_directory(directory):
+    from sphinx.util.docutils import docutils_namespace
+
+    cwd = os.getcwd()
+    os.chdir(directory)
+    sys.path.insert(0, str(directory))
+
+    try:
+        # directives and nodes registered by the sphinx application are global
+        with docutils_namespace():
+            yield
+    finally:
+        sys.path.remove(str(directory))
+        os.chdir(cwd)
+
+
+def bench_startup(project, repeat=5):
+    def best(*args):
+        return min(
+            time_command([sys.executable, *args], project) for _ in range(repeat)
+        )
+
+    return {
+        "import": best("-c", "import mudkip.cli"),
+        "version": best("-m", "mudkip", "--version"),
+        "clean": best("-m", "mudkip", "clean"),
+    }
+
+
+def bench_build(project, jobs=("1",)):
+    results = {}
+
+    for value in jobs:
+        shutil.rmtree(project / "docs" / "_build", ignore_errors=True)
+        results[f"cold.jobs={value}"] = run_build(project, "--jobs", value)
+
+    results["noop"] = run_build(project)
+
+    return results
+
+
+def bench_edit(project):
+    from watchdog.events import FileModifiedEvent
+
+    from .application import Mudkip
+    from .watch import EventBatch
+
+    results = {}
+
+    with working_directory(project):
+        application = Mudkip()
+        application.build()
+
+        edits = {
+            "page": project / "docs" / "pages" / "page0.rst",
+            "module": project / PACKAGE / "module0.py",
+        }
+
+        for name, path in edits.items():
+            original = path.read_text()
+            comment = "\n.. comment\n" if path.suffix == ".rst" else "\n# comment\n"
+            path.write_text(original + comment)
+
+            try:
+                batch = EventBatch([], [], [FileModifiedEvent(str(path))], [])
+                start = time.perf_counter()
+                application.build(event_batch=batch)
+                results[name] = time.perf_counter() - start
+            finally:
+                path.write_text(original)
+                application.build(event_batch=batch)
+
+    return results
+
+
+def bench_vitepress(project):
+    output_dir = "docs/_vitepress"
+    shutil.rmtree(project / output_dir, ignore_errors=True)
+
+    args = ["--preset", "vitepress", "--output-dir", output_dir]
+
+    return {
+        "cold": run_build(project, *args, output_dir=output_dir),
+        "noop": run_build(project, *args, output_dir=output_dir),
+    }
+
+
+def html_translator():
+    from docutils.nodes import SkipNode
+    from sphinx.writers.html5 import HTML5Translator
+
+    heading_regex = re.compile(r".*(</h[123456]>).*")
+
+    # the html output rewritten with a regex that vitepress pages used to go through
+    class HeadingRegexTranslator(HTML5Translator):
+        def depart_title(self, node):
+            super().depart_title(node)
+
+            if m := heading_regex.match(self.body[-1]):
+                title = ""
+                tag = m[1].replace("/", "")
+                level = int(tag[2])
+
+                while True:
+                    fragment = self.body.pop()
+                    title = fragment + title
+                    if tag in fragment:
+                        break
+
+                before, _, title = title.partition(tag)
+                title, _, after = title.partition(m[1])
+                self.body.append(f"{before}\n\n{'#' * level} {title}\n\n{after}")
+
+        def visit_literal_block(self, node):
+            lang = node.get("language", "")
+            self.body.append(f"\n\n```{lang}\n{node.rawsource.strip()}\n```\n\n")
+            raise SkipNode
+
+    return HeadingRegexTranslator
+
+
+def bench_markdown(project, repeat=5):
+    from docutils.io import StringOutput
+
+    from .application import Mudkip
+    from .markdown import MarkdownWriter
+
+    output_dir = project / "docs" / "_vitepress"
+    docname = "api/large"
+
+    with working_directory(project):
+        application = Mudkip(preset="vitepress", output_dir=str(output_dir))
+        application.build()
+
+        builder = application.sphinx.builder
+        builder.prepare_writing({docname})
+        builder.current_docname = docname
+
+        doctree = application.sphinx.env.get_and_resolve_doctree(docname, builder)
+        doctree.settings = builder.docsettings
+        translator = html_translator()
+
+        def translate_html(document):
+            visitor = translator(document, builder)
+            document.walkabout(visitor)
+            return "".join(visitor.body)
+
+        def translate_markdown(document):
+            output = StringOutput(encoding="utf-8")
+            return MarkdownWriter(builder).write(document, output)
+
+        def best(function):
+            timings = []
+            for _ in range(repeat):
+                document = doctree.deepcopy()
+                start = time.perf_counter()
+                function(document)
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        return {"html": best(translate_html), "markdown": best(translate_markdown)}
+
+
+@contextmanager
+def serve(handlers, transforms):
+    import asyncio
+
+    from tornado import web
+    from tornado.httpserver import HTTPServer
+    from tornado.netutil import bind_sockets
+
+    sockets = bind_sockets(0, "127.0.0.1")
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        application = web.Application(handlers, transforms=transforms)
+        server = HTTPServer(application)
+        server.add_sockets(sockets)
+        loop.call_soon(started.set)
+        loop.run_forever()
+        server.stop()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait()
+
+    try:
+        yield sockets[0].getsockname()[1]
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+
+def request_latency(port, paths, requests, encoding):
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    timings = []
+
+    for i in range(requests):
+        start = time.perf_counter()
+        connection.request(
+            "GET", paths[i % len(paths)], headers={"Accept-Encoding": encoding}
+        )
+        response = connection.getresponse()
+        response.read()
+        timings.append(time.perf_counter() - start)
+
+        if response.status != 200:
+            raise RuntimeError(f"Unexpected status {response.status}")
+
+    connection.close()
+    timings.sort()
+
+    return {
+        "median": median(timings),
+        "p95": timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def bench_server(project, requests=500):
+    from livereload.handlers import StaticFileHandler
+    from livereload.server import LiveScriptInjector
+
+    from .server import CachedFileHandler, FileCache
+
+    root = project / "docs" / "_build" / "dist"
+
+    if not (root / "index.html").is_file():
+        run_build(project)
+
+    paths = [
+        "/" + path.relative_to(root).as_posix()
+        for path in sorted(root.rglob("*"))
+        if path.suffix in (".html", ".css", ".js") and path.is_file()
+    ]
+
+    script = b"<script></script>"
+
+    class Injector(LiveScriptInjector):
+        pass
+
+    Injector.script = script
+
+    servers = {
+        "livereload": (StaticFileHandler, {"path": str(root)}, [Injector]),
+        "cached": (
+            CachedFileHandler,
+            {"path": str(root), "cache": FileCache(), "script": script},
+            [],
+        ),
+    }
+
+    results = {}
+
+    for name, (handler, options, transforms) in servers.items():
+        with serve([(r"/(.*)", handler, options)], transforms) as port:
+            request_latency(port, paths, len(paths), "identity")
+            for encoding in ("identity", "gzip"):
+                latency = request_latency(port, paths, requests, encoding)
+                for key, value in latency.items():
+                    results[f"{name}.{encoding}.{key}"] = value
+
+    return results
+
+
+def bench_events(count=100000, paths=20000):
+    from watchdog.events import (
+        FileCreatedEvent,
+        FileDeletedEvent,
+        FileModifiedEvent,
+        FileMovedEvent,
+    )
+
+    from .watch import DirectoryWatcher
+
+    watcher = DirectoryWatcher([], debounce_time=0.05)
+    categories = [watcher.moved, watcher.created, watcher.modified, watcher.deleted]
+    rng = random.Random(0)
+
+    events = []
+    for _ in range(count):
+        path = f"/bench/{rng.randrange(paths)}.rst"
+        kind = rng.randrange(4)
+        if kind == 0:
+            event = FileMovedEvent(path, path + ".moved")
+        else:
+            event = (FileCreatedEvent, FileModifiedEvent, FileDeletedEvent)[kind - 1]
+            event = event(path)
+        events.append((categories[kind], event))
+
+    start = time.perf_counter()
+    for category, event in events:
+        watcher.callback(category, event)
+    dispatch = time.perf_counter() - start
+
+    batch = watcher.queue.get(timeout=10)
+    total = time.perf_counter() - start
+
+    return {
+        "dispatch": dispatch,
+        "batch": total - watcher.debounce_time,
+        "coalesced": len(batch.all_events),
+    }
+
+
+def bench_polling(directory, files=50000, per_directory=100):
+    from .polling import SnapshotObserver
+    from .watch import DirectoryWatcher, EventHandler
+
+    root = Path(directory)
+    shutil.rmtree(root, ignore_errors=True)
+
+    for i in range(files):
+        subdir = root / f"dir{i // per_directory}"
+        if i % per_directory == 0:
+            subdir.mkdir(parents=True)
+        (subdir / f"file{i}.rst").touch()
+
+    try:
+        watcher = DirectoryWatcher([root], ignore_patterns=["_*", "**/_*"])
+        handler = EventHandler(watcher, str(root), ["*.rst"], False, False)
+        observer = SnapshotObserver(watcher)
+
+        start = time.perf_counter()
+        observer.schedule(handler, str(root), True)
+        index = time.perf_counter() - start
+
+        start = time.perf_counter()
+        observer.scan()
+        scan = time.perf_counter() - start
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    return {"index": index, "scan": scan, "files": len(observer.files)}
+
+
+def run_benchmarks(
+    directory,
+    selected=BENCHMARKS,
+    pages=50,
+    notebooks=2,
+    modules=10,
+    members=200,
+    jobs=("1",),
+    events=100000,
+    files=50000,
+    requests=500,
+    progress=None,
+):
+    directory = Path(directory).absolute()
+    project = generate_project(
+        directory / "project", pages, notebooks, modules, members
+    )
+
+    benchmarks = {
+        "startup": lambda: bench_startup(project),
+        "build": lambda: bench_build(project, jobs),
+        "edit": lambda: bench_edit(project),
+        "vitepress": lambda: bench_vitepress(project),
+        "markdown": lambda: bench_markdown(project),
+        "server": lambda: bench_server(project, requests),
+        "events": lambda: bench_events(events),
+        "polling": lambda: bench_polling(directory / "polling", files),
+    }
+
+    results = {}
+
+    for name in BENCHMARKS:
+        if name not in selected:
+            continue
+        if progress:
+            progress(name)
+        for key, value in benchmarks[name]().items():
+            if isinstance(value, dict):
+                for metric, number in value.items():
+                    results[f"{name}.{key}.{metric}"] = number
+            else:
+                results[f"{name}.{key}"] = value
+
+    return {
+        "mudkip": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parameters": {
+            "pages": pages,
+            "notebooks": notebooks,
+            "modules": modules,
+            "members": members,
+            "jobs": list(jobs),
+            "events": events,
+            "files": files,
+            "requests": requests,
+        },
+        "results": dict(sorted(results.items())),
+    }
+
+
+def compare(previous, current):
+    rows = []
+
+    for name, value in current["results"].items():
+        before = previous.get("results", {}).get(name)
+        ratio = value / before if before else None
+        rows.append((name, before, value, ratio))
+
+    return rows
@@ -1,14 +1,17 @@
+import json
 import sys
 import time
 from contextlib import contextmanager
 from functools import wraps
 from os import path
+from tempfile import TemporaryDirectory
 from traceback import format_exc, print_exception
 
 import click
 
 from . import __version__
 from .application import Mudkip
+from .bench import BENCHMARKS, compare, run_benchmarks
 from .config import Config
 from .errors import MudkipError
 from .preset import Preset
@@ -16,6 +19,33 @@ from .preset import Preset
 DIRECTORY = click.Path(file_okay=False)
 
 
+def parse_jobs(_ctx, _param, value):
+    if value is None or value == "auto":
+        return value
+    try:
+        jobs = int(value)
+    except ValueError:
+        jobs = 0
+    if jobs < 1:
+        raise click.BadParameter('Expected a positive integer or "auto".')
+    return jobs
+
+
+profile_option = click.option(
+    "--profile",
+    is_flag=True,
+    help="Record the time spent in each phase and document.",
+)
+
+
+jobs_option = click.option(
+    "-j",
+    "--jobs",
+    callback=parse_jobs,
+    help='Number of parallel processes, or "auto" to use all cores.',
+)
+
+
 @contextmanager
 def exception_handler(exit=False, verbose=False):
     try:
@@ -33,6 +63,34 @@ def exception_handler(exit=False, verbose=False):
             sys.exit(1)
 
 
+def print_profile(application, top=10):
+    if not application.profiler:
+        return
+
+    summary_file, trace_file = application.write_profile()
+    profiler = application.profiler
+
+    click.secho("\nPhases:", fg="black", bold=True)
+    for phase in profiler.aggregate("phase"):
+        click.echo(
+            f"{phase['wall']:8.2f}s wall {phase['cpu']:8.2f}s cpu  {phase['name']}"
+        )
+
+    if documents := profiler.documents()[:top]:
+        click.secho(f"\nSlowest {len(documents)} documents:", fg="black", bold=True)
+        for document in documents:
+            click.echo(
+                f"{document['wall']:8.2f}s wall {document['cpu']:8.2f}s cpu  "
+                f"{document['docname']}"
+            )
+
+    click.secho(
+        f"\nProfile written to {summary_file} and {trace_file}.",
+        fg="black",
+        bold=True,
+    )
+
+
 def print_version(ctx, _param, value):
     if not value or ctx.resilient_parsing:
         return
@@ -76,11 +134,18 @@ def with_application(command):
             base_url=base_url,
             repository=repository,
             verbose=verbose,
+            jobs=kwargs.pop("jobs", None),
         )
         for key, value in tuple(params.items()):
             if not value:
                 del params[key]
-        return command(*args, application=Mudkip(**params), **kwargs)
+        if kwargs.pop("no_cache", False):
+            params["notebook_cache"] = False
+        if kwargs.pop("optimize_assets", False):
+            params["optimize_assets"] = True
+        profile = kwargs.pop("profile", False)
+        application = Mudkip(profile=profile, **params)
+        return command(*args, application=application, **kwargs)
 
     return wrapper
 
@@ -109,13 +174,30 @@ def init(application, title):
     is_flag=True,
     help="Do not check external links for integrity.",
 )
+@click.option(
+    "--recheck-links",
+    is_flag=True,
+    help="Check all external links even if they were checked recently.",
+)
 @click.option(
     "--update-gh-pages",
     is_flag=True,
     help="Update GitHub Pages.",
 )
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Execute all the notebooks without using the cache.",
+)
+@click.option(
+    "--optimize-assets",
+    is_flag=True,
+    help="Minify, precompress and fingerprint the generated files.",
+)
+@profile_option
+@jobs_option
 @with_application
-def build(application, check, skip_broken_links, update_gh_pages):
+def build(application, check, skip_broken_links, recheck_links, update_gh_pages):
     """Build documentation."""
     padding = "\n" * application.config.verbose
 
@@ -131,13 +213,42 @@ def build(application, check, skip_broken_links, update_gh_pages):
         f'{padding}{action} "{application.config.source_dir}"...{padding}', fg="cyan"
     )
 
-    with exception_handler(exit=True, verbose=application.config.verbose):
-        application.build(
-            check=check,
-            skip_broken_links=skip_broken_links,
-            update_gh_pages=update_gh_pages,
+    if reason := application.fresh_env_reason:
+        click.secho(
+            f"Reading all documents ({reason}).{padding}", fg="black", bold=True
+        )
+
+    try:
+        with exception_handler(exit=True, verbose=application.config.verbose):
+            application.build(
+                check=check,
+                skip_broken_links=skip_broken_links,
+                recheck_links=recheck_links,
+                update_gh_pages=update_gh_pages,
+                optimize_assets=application.config.optimize_assets,
+            )
+    finally:
+        print_profile(application)
+
+    if report := application.asset_report:
+        saved = [f"{(report['original'] - report['minified']) / 1024:.1f} KB"]
+        saved.append(f"{(report['original'] - report['gzip']) / 1024:.1f} KB with gzip")
+        if report["brotli"] is not None:
+            saved.append(
+                f"{(report['original'] - report['brotli']) / 1024:.1f} KB with brotli"
+            )
+
+        click.secho(
+            f"\nOptimized {report['processed']} files "
+            f"({report['cached']} cached, {report['files']} total), "
+            f"saved {', '.join(saved)}.",
+            fg="black",
+            bold=True,
         )
 
+    if update_gh_pages and not application.gh_pages_updated:
+        click.secho("\nGitHub Pages are already up to date.", fg="black", bold=True)
+
     message = "All good" if check and not update_gh_pages else "Done"
     click.secho(f"\n{message}.", fg="yellow")
 
@@ -155,9 +266,29 @@ def build(application, check, skip_broken_links, update_gh_pages):
 @click.option("-n", "--notebook", is_flag=True, help="Open the Jupyter notebook.")
 @click.option("--notebook-host", help="Notebook host.", default="localhost")
 @click.option("--notebook-port", help="Notebook port.", default=8888)
+@click.option(
+    "--fork",
+    is_flag=True,
+    help="Rebuild in a forked process to keep imports isolated.",
+)
+@click.option(
+    "--watcher",
+    type=click.Choice(["native", "polling"]),
+    default="native",
+    help="How to detect file changes.",
+)
+@jobs_option
 @with_application
 def develop(
-    application, open_browser, host, port, notebook, notebook_host, notebook_port
+    application,
+    open_browser,
+    host,
+    port,
+    notebook,
+    notebook_host,
+    notebook_port,
+    fork,
+    watcher,
 ):
     """Start development server."""
     padding = "\n" * application.config.verbose
@@ -193,6 +324,14 @@ def develop(
         with exception_handler(verbose=application.config.verbose):
             yield
 
+        tracker = application.module_tracker
+        if application.config.verbose and (tracker.reloaded or tracker.kept):
+            click.secho(
+                f"\nReloaded {tracker.reloaded} modules, kept {tracker.kept}.",
+                fg="black",
+                bold=True,
+            )
+
     try:
         application.develop(
             open_browser,
@@ -202,12 +341,16 @@ def develop(
             notebook_host,
             notebook_port,
             build_manager,
+            fork,
+            watcher == "polling",
         )
     except KeyboardInterrupt:
         click.secho("\nExit.", fg="yellow")
 
 
 @mudkip.command()
+@profile_option
+@jobs_option
 @with_application
 def test(application):
     """Test documentation."""
@@ -217,8 +360,11 @@ def test(application):
         f'{padding}Testing "{application.config.source_dir}"...{padding}', fg="cyan"
     )
 
-    with exception_handler(exit=True, verbose=application.config.verbose):
-        passed, summary = application.test()
+    try:
+        with exception_handler(exit=True, verbose=application.config.verbose):
+            passed, summary = application.test()
+    finally:
+        print_profile(application)
 
     if not application.config.verbose:
         click.echo("\n" + summary)
@@ -244,5 +390,142 @@ def clean(application):
     click.secho("\nDone.", fg="yellow")
 
 
+@mudkip.group()
+def cache():
+    """Manage the notebook cache."""
+
+
+@cache.command()
+@with_application
+def stats(application):
+    """Show notebook cache statistics."""
+    padding = "\n" * application.config.verbose
+    directory = application.notebook_cache.directory
+
+    click.secho(f'{padding}Inspecting "{directory}"...\n', fg="cyan")
+
+    with exception_handler(exit=True, verbose=application.config.verbose):
+        partitions = application.notebook_cache.stats()
+
+    for partition in partitions:
+        accessed = partition["accessed"]
+        accessed = accessed.strftime("%Y-%m-%d %H:%M") if accessed else "never"
+        status = "current" if partition["current"] else "stale"
+
+        click.echo(
+            f"{partition['path'].name} ({status}): {partition['notebooks']} "
+            f"notebooks, {partition['size'] / 1024 / 1024:.1f} MB, "
+            f"last accessed {accessed}"
+        )
+
+    if not partitions:
+        click.echo("The cache is empty.")
+
+
+@cache.command()
+@click.option("--max-age", type=float, help="Maximum age in days.")
+@click.option("--max-size", type=float, help="Maximum size in megabytes.")
+@click.option("--all", "everything", is_flag=True, help="Remove everything.")
+@with_application
+def prune(application, max_age, max_size, everything):
+    """Remove old notebook cache entries."""
+    padding = "\n" * application.config.verbose
+    directory = application.notebook_cache.directory
+
+    click.secho(f'{padding}Pruning "{directory}"...', fg="cyan")
+
+    with exception_handler(exit=True, verbose=application.config.verbose):
+        removed, freed = application.notebook_cache.prune(max_age, max_size, everything)
+
+    click.secho(
+        f"\nRemoved {removed} notebooks, freed {freed / 1024 / 1024:.1f} MB.",
+        fg="yellow",
+    )
+
+
+@mudkip.command()
+@click.option("--pages", default=50, help="Number of generated pages.")
+@click.option("--notebooks", default=2, help="Number of generated notebooks.")
+@click.option("--modules", default=10, help="Number of generated modules.")
+@click.option(
+    "--members",
+    default=200,
+    help="Number of functions on the largest autodoc page.",
+)
+@click.option(
+    "--jobs",
+    default="1",
+    help="Comma-separated values of --jobs for the cold builds.",
+)
+@click.option("--events", default=100000, help="Number of watcher events.")
+@click.option("--files", default=50000, help="Number of files for the polling scan.")
+@click.option("--requests", default=500, help="Number of development server requests.")
+@click.option(
+    "--only",
+    multiple=True,
+    type=click.Choice(BENCHMARKS),
+    help="Only run the given benchmarks.",
+)
+@click.option("--directory", type=DIRECTORY, help="Where to generate the project.")
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False),
+    help="Write the results to a JSON file.",
+)
+@click.option(
+    "--compare",
+    "previous",
+    type=click.File(),
+    help="Compare with the results of a previous run.",
+)
+def bench(
+    pages,
+    notebooks,
+    modules,
+    members,
+    jobs,
+    events,
+    files,
+    requests,
+    only,
+    directory,
+    output,
+    previous,
+):
+    """Run benchmarks on a generated project."""
+    previous = previous and json.load(previous)
+
+    with exception_handler(exit=True), TemporaryDirectory() as tmp:
+        report = run_benchmarks(
+            directory or tmp,
+            only or BENCHMARKS,
+            pages,
+            notebooks,
+            modules,
+            members,
+            [value.strip() for value in jobs.split(",")],
+            events,
+            files,
+            requests,
+            lambda name: click.secho(f"Running {name} benchmarks...", fg="cyan"),
+        )
+
+    click.echo()
+
+    for name, before, value, ratio in compare(previous or {}, report):
+        line = f"{name}: {value:.4g}"
+        if ratio is not None:
+            line += f" (was {before:.4g}, {ratio:.2f}x)"
+        click.echo(line)
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        click.secho(f"\nResults written to {output}.", fg="black", bold=True)
+
+    click.secho("\nDone.", fg="yellow")
+
+
 def main():
     mudkip(prog_name="mudkip")
@@ -1,3 +1,4 @@
+import os
 import re
 from pathlib import Path
 
@@ -44,6 +45,21 @@ class Config:
         poetry=None,
         override=None,
         section_label_depth=None,
+        persistent_env=True,
+        jobs=None,
+        preload_modules=(),
+        detect_extensions=True,
+        notebook_cache=True,
+        notebook_cache_max_age=30,
+        notebook_cache_max_size=1024,
+        notebook_workers=2,
+        link_cache=True,
+        link_cache_ttl=None,
+        link_host_workers=2,
+        optimize_assets=False,
+        fingerprint_assets=True,
+        incremental_gh_pages=False,
+        gh_pages_depth=1,
     ):
         self.preset = preset if isinstance(preset, Preset) else Preset.get(preset)
         self.dev_server = dev_server
@@ -79,6 +95,21 @@ class Config:
         self.version = version or self.release and ".".join(self.release.split(".")[:2])
 
         self.section_label_depth = section_label_depth
+        self.persistent_env = persistent_env
+        self.jobs = (os.cpu_count() or 1) if jobs == "auto" else int(jobs or 1)
+        self.preload_modules = list(preload_modules)
+        self.detect_extensions = detect_extensions
+        self.notebook_cache = notebook_cache
+        self.notebook_cache_max_age = notebook_cache_max_age
+        self.notebook_cache_max_size = notebook_cache_max_size
+        self.notebook_workers = int(notebook_workers)
+        self.link_cache = link_cache
+        self.link_cache_ttl = link_cache_ttl or {}
+        self.link_host_workers = int(link_host_workers)
+        self.optimize_assets = optimize_assets
+        self.fingerprint_assets = fingerprint_assets
+        self.incremental_gh_pages = incremental_gh_pages
+        self.gh_pages_depth = gh_pages_depth
 
         self.mkdir += self.source_dir, self.output_dir
 
@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+from contextlib import contextmanager
+from copy import copy
+from pathlib import Path
+from weakref import WeakSet
+
+from sphinx.environment import BuildEnvironment
+from sphinx.util import logging as sphinx_logging
+from sphinx.util.build_phase import BuildPhase
+
+
+class WarningRecorder(logging.Handler):
+    def __init__(self, log, app):
+        super().__init__(logging.WARNING)
+        self.log = log
+        self.app = app
+        self.seen = WeakSet()
+        self.translator = sphinx_logging.WarningLogRecordTranslator(app)
+        self.addFilter(sphinx_logging.WarningSuppressor(app))
+
+    def handle(self, record):
+        # warnings postponed by pending_warnings() are handled again when flushed
+        if record in self.seen:
+            return False
+
+        self.seen.add(record)
+
+        # sphinx's own handlers translate the location of the same record in
+        # place, translating it twice would append the suffix again
+        if not isinstance(record, sphinx_logging.SphinxWarningLogRecord):
+            record = copy(record)
+            self.translator.filter(record)
+
+        return super().handle(record)
+
+    def emit(self, record):
+        if getattr(record, "skip_warningsiserror", False):
+            return
+
+        location = getattr(record, "location", None)
+        self.log.add(self.app, location, record.getMessage())
+
+
+class WarningLog:
+    def __init__(self, filename):
+        self.filename = Path(filename)
+        self.strict = False
+        self.load()
+
+    def load(self):
+        try:
+            data = json.loads(self.filename.read_text())
+        except (OSError, ValueError):
+            data = {}
+
+        self.read = data.get("read", {})
+        self.write = data.get("write", {})
+        self.consistency = data.get("consistency", [])
+        self.strict_docs = set(data.get("strict", []))
+
+        self.pending_read = {}
+        self.pending_write = {}
+        self.pending_consistency = []
+        self.checking_consistency = False
+        self.checked_consistency = False
+        self.written = set()
+        self.other = []
+
+    def save(self, app):
+        docs = app.env.all_docs
+        builder = app.builder.name
+
+        self.read.update(self.pending_read)
+        self.read = {d: w for d, w in self.read.items() if d in docs}
+
+        write = self.write.setdefault(builder, {})
+        write.update((d, self.pending_write.get(d, [])) for d in self.written)
+        self.write[builder] = {d: w for d, w in write.items() if d in docs}
+
+        if self.checked_consistency:
+            self.consistency = self.pending_consistency
+
+        self.strict_docs.intersection_update(docs)
+
+        data = {
+            "read": self.read,
+            "write": self.write,
+            "consistency": self.consistency,
+            "strict": sorted(self.strict_docs),
+        }
+
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.filename.with_name(self.filename.name + ".tmp")
+        temporary.write_text(json.dumps(data))
+        os.replace(temporary, self.filename)
+
+    @contextmanager
+    def record(self, app, strict=False):
+        self.load()
+        self.strict = strict
+
+        handler = WarningRecorder(self, app)
+        logger = logging.getLogger(sphinx_logging.NAMESPACE)
+        logger.addHandler(handler)
+        app.mudkip_warning_log = self
+
+        check_consistency = BuildEnvironment.check_consistency
+
+        # the consistency check and the resolving phase share the same value
+        def checking_consistency(env):
+            self.checking_consistency = True
+            try:
+                return check_consistency(env)
+            finally:
+                self.checking_consistency = False
+
+        BuildEnvironment.check_consistency = checking_consistency
+
+        try:
+            yield self
+        finally:
+            BuildEnvironment.check_consistency = check_consistency
+            logger.removeHandler(handler)
+            app.mudkip_warning_log = None
+            self.save(app)
+
+    def docname(self, env, location):
+        if docname := env.temp_data.get("docname"):
+            return docname
+
+        filename = location and location.rsplit(":", 1)[0]
+
+        while filename:
+            if docname := env.path2doc(filename):
+                return docname
+            filename = filename.rpartition(":")[0]
+
+        return None
+
+    def add(self, app, location, message):
+        if self.checking_consistency:
+            self.pending_consistency.append(message)
+            return
+
+        docname = self.docname(app.env, location)
+
+        if app.phase == BuildPhase.READING and docname in self.pending_read:
+            self.pending_read[docname].append(message)
+        elif app.phase in (BuildPhase.RESOLVING, BuildPhase.WRITING) and docname:
+            self.pending_write.setdefault(docname, []).append(message)
+        else:
+            self.other.append(message)
+
+    def reading(self, docnames):
+        for docname in docnames:
+            self.pending_read[docname] = []
+            if self.strict:
+                self.strict_docs.add(docname)
+            else:
+                self.strict_docs.discard(docname)
+
+    def warnings(self, app):
+        docs = app.env.found_docs
+        write = self.write.get(app.builder.name, {})
+        warnings = list(self.other) + list(self.consistency)
+
+        for docname in sorted(docs):
+            warnings += self.read.get(docname, []) + write.get(docname, [])
+
+        return list(dict.fromkeys(warnings))
+
+
+def record_read_documents(app, env, docnames):
+    if log := app.mudkip_warning_log:
+        log.reading(docnames)
+
+
+def record_consistency_check(app, env):
+    if log := app.mudkip_warning_log:
+        log.checked_consistency = True
+
+
+def record_written_document(app, doctree, docname):
+    if log := app.mudkip_warning_log:
+        log.written.add(docname)
+
+
+def outdated_strict_documents(app, env, added, changed, removed):
+    log = app.mudkip_warning_log
+
+    if not log or not log.strict:
+        return []
+
+    notebooks = getattr(env, "nb_metadata", {})
+    return [docname for docname in notebooks if docname not in log.strict_docs]
+
+
+def setup_warning_log(app):
+    app.mudkip_warning_log = None
+
+    app.connect("env-before-read-docs", record_read_documents)
+    app.connect("env-check-consistency", record_consistency_check)
+    app.connect("doctree-resolved", record_written_document)
+    app.connect("env-get-outdated", outdated_strict_documents)
@@ -1,10 +1,15 @@
 from . import __version__
+from .autodoc import setup_autodoc_index
+from .diagnostics import setup_warning_log
+from .kernels import setup_notebook_executor
+from .linkcheck import CachedLinkCheckBuilder
+from .profiling import setup_profiling
+from .relations import get_relations, setup_relations
 from .vitepress import VitePressBuilder
 
 
 def process_doctree(app, doctree, docname):
-    relations = app.env.collect_relations()
-    parent, prev, next = relations.get(docname, (None,) * 3)
+    parent, prev, next = get_relations(app.env).get(docname, (None,) * 3)
 
     attributes = {"name": docname, "parent": parent, "prev": prev, "next": next}
 
@@ -13,10 +18,32 @@ def process_doctree(app, doctree, docname):
             doctree[name] = value
 
 
+def track_written_document(app, doctree, docname):
+    app.mudkip_written_docs.add(docname)
+
+
+def outdated_documents(app, env, added, changed, removed):
+    return app.mudkip_outdated_docs
+
+
 def setup(app):
+    app.mudkip_outdated_docs = set()
+    app.mudkip_written_docs = set()
+    app.mudkip_link_cache = None
+    app.mudkip_link_host_workers = 2
+
     app.connect("doctree-resolved", process_doctree)
+    app.connect("doctree-resolved", track_written_document)
+    app.connect("env-get-outdated", outdated_documents)
+
+    setup_autodoc_index(app)
+    setup_notebook_executor(app)
+    setup_profiling(app)
+    setup_relations(app)
+    setup_warning_log(app)
 
     app.add_builder(VitePressBuilder)
+    app.add_builder(CachedLinkCheckBuilder, override=True)
 
     return {
         "version": __version__,
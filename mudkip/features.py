@@ -0,0 +1,176 @@
+import json
+import os
+import re
+from pathlib import Path
+
+from .fingerprint import fingerprint
+
+SUFFIX_FEATURES = {".rst": None, ".md": "markdown", ".ipynb": "notebooks"}
+
+
+EXTENSION_CONFIG_PREFIXES = {
+    "myst_nb": ("nb_", "myst_"),
+    "sphinx.ext.autodoc": ("autodoc_", "autoclass_"),
+    "sphinx.ext.napoleon": ("napoleon_",),
+    "sphinx.ext.doctest": ("doctest_",),
+    "sphinx.ext.intersphinx": ("intersphinx_",),
+    "sphinxcontrib.mermaid": ("mermaid_",),
+}
+
+
+def configured_extensions(conf):
+    return {
+        extension
+        for extension, prefixes in EXTENSION_CONFIG_PREFIXES.items()
+        if any(name.startswith(prefixes) for name in conf)
+    }
+
+
+def directive_regex(*names):
+    names = "|".join(names)
+    return re.compile(rf"(?:\.\.\s+|\{{)(?:{names})(?:::|\}})")
+
+
+FEATURE_REGEX = {
+    "autodoc": directive_regex(
+        "automodule",
+        "autoclass",
+        "autoexception",
+        "autofunction",
+        "autodecorator",
+        "autodata",
+        "automethod",
+        "autoattribute",
+        "autoproperty",
+    ),
+    "doctest": re.compile(
+        directive_regex(
+            "doctest", "testcode", "testoutput", "testsetup", "testcleanup"
+        ).pattern
+        + r"|^\s*>>> ",
+        re.MULTILINE,
+    ),
+    "mermaid": directive_regex("mermaid", "autoclasstree"),
+    "python_roles": re.compile(
+        r"[:{](?:py:)?(?:mod|func|data|const|class|meth|attr|exc|obj)[:}]`"
+    ),
+}
+
+
+def suffix_features(source_suffix=None):
+    features = dict(SUFFIX_FEATURES)
+
+    if isinstance(source_suffix, str):
+        source_suffix = [source_suffix]
+    if not isinstance(source_suffix, dict):
+        source_suffix = dict.fromkeys(source_suffix or (), "restructuredtext")
+
+    # other file types need the parsers registered by myst_nb
+    for suffix, filetype in source_suffix.items():
+        features[suffix] = None if filetype == "restructuredtext" else "markdown"
+
+    return features
+
+
+def file_features(path, feature=None):
+    features = set()
+
+    if feature:
+        features.add(feature)
+
+    try:
+        text = path.read_text("utf-8", errors="replace")
+    except OSError:
+        return features
+
+    features.update(name for name, regex in FEATURE_REGEX.items() if regex.search(text))
+
+    return features
+
+
+class FeatureDetector:
+    def __init__(self, source_dir, cache_file, excluded=None, suffixes=None):
+        self.source_dir = Path(source_dir)
+        self.cache_file = Path(cache_file)
+        self.excluded = excluded or (lambda relative: False)
+        self.suffixes = suffixes or SUFFIX_FEATURES
+
+    def scan(self):
+        files = {}
+
+        for directory, dirnames, filenames in os.walk(self.source_dir):
+            prefix = os.path.relpath(directory, self.source_dir).replace(os.sep, "/")
+            prefix = "" if prefix == "." else prefix + "/"
+
+            dirnames[:] = [d for d in dirnames if not self.excluded(prefix + d)]
+
+            for filename in filenames:
+                relative = prefix + filename
+
+                if filename.endswith(tuple(self.suffixes)) and not self.excluded(
+                    relative
+                ):
+                    try:
+                        stat = os.stat(os.path.join(directory, filename))
+                    except OSError:
+                        continue
+                    files[relative] = [stat.st_mtime_ns, stat.st_size]
+
+        return files
+
+    def detect(self, required=()):
+        files = self.scan()
+        tree = fingerprint([self.suffixes, files])
+
+        try:
+            cache = json.loads(self.cache_file.read_text())
+        except (OSError, ValueError):
+            cache = {}
+
+        # features are never dropped, otherwise removing the last use of a
+        # feature would change the extensions and make sphinx read everything
+        features = set(cache.get("features", [])).union(required)
+
+        if cache.get("tree") == tree:
+            if features.issubset(cache["features"]):
+                return features
+            entries = cache["files"]
+        else:
+            cached = cache.get("files", {})
+            if cache.get("suffixes") != self.suffixes:
+                cached = {}
+
+            entries = {}
+
+            # only the files that changed since the last scan need to be read again
+            for relative, signature in files.items():
+                entry = cached.get(relative)
+
+                if entry and entry[:2] == signature:
+                    entries[relative] = entry
+                else:
+                    path = self.source_dir / relative
+                    feature = self.suffixes.get(self.suffix(relative))
+                    found = file_features(path, feature)
+                    entries[relative] = signature + [sorted(found)]
+
+            features.update(*(entry[2] for entry in entries.values()))
+
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.cache_file.with_name(self.cache_file.name + ".tmp")
+        data = {
+            "tree": tree,
+            "suffixes": self.suffixes,
+            "features": sorted(features),
+            "files": entries,
+        }
+        temporary.write_text(json.dumps(data))
+        os.replace(temporary, self.cache_file)
+
+        return features
+
+    def suffix(self, filename):
+        # source suffixes like .en.rst can contain more than one dot
+        return max(
+            (suffix for suffix in self.suffixes if filename.endswith(suffix)), key=len
+        )
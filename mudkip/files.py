@@ -0,0 +1,27 @@
+import os
+from pathlib import Path
+
+
+def file_signature(filename):
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def write_if_changed(filename, content):
+    filename = Path(filename)
+
+    try:
+        if filename.stat().st_size == len(content) and filename.read_bytes() == content:
+            return False
+    except OSError:
+        pass
+
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    temporary = filename.with_name(f".{filename.name}.{os.getpid()}.tmp")
+    temporary.write_bytes(content)
+    os.replace(temporary, filename)
+
+    return True
@@ -0,0 +1,35 @@
+import hashlib
+import json
+from pathlib import Path
+
+
+def fingerprint(value):
+    dump = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(dump.encode()).hexdigest()
+
+
+class FingerprintFile:
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def read(self):
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def write(self, components):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(components, indent=2, sort_keys=True))
+
+    def changes(self, components):
+        previous = self.read()
+
+        if previous is None:
+            return ["no saved fingerprint"]
+
+        return [
+            f"{key} changed"
+            for key in sorted(set(previous) | set(components))
+            if previous.get(key) != components.get(key)
+        ]
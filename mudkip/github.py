@@ -1,16 +1,29 @@
+import os
 import shutil
 import subprocess
 from functools import partial
+from hashlib import sha1
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
 
+def blob_hash(path):
+    with open(path, "rb") as f:
+        content = f.read()
+    return sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
 class GitHubPagesUpdater:
-    def __init__(self, upload_dir, repository):
+    def __init__(self, upload_dir, repository, clone_dir=None, depth=None):
         self.upload_dir = Path(upload_dir).absolute()
         self.repository = repository
+        self.clone_dir = clone_dir and Path(clone_dir).absolute()
+        self.depth = depth
 
     def update(self):
+        if self.clone_dir:
+            return self.update_incremental()
+
         with TemporaryDirectory() as tmp:
             shutil.copytree(self.upload_dir, tmp, dirs_exist_ok=True)
 
@@ -22,3 +35,99 @@ class GitHubPagesUpdater:
             run(["git", "commit", "-m", "Update GitHub Pages"])
             run(["git", "remote", "add", "origin", self.repository])
             run(["git", "push", "-f", "origin", "gh-pages"])
+
+        return True
+
+    def update_incremental(self):
+        self.clone_dir.mkdir(parents=True, exist_ok=True)
+
+        run = partial(subprocess.run, check=True, cwd=self.clone_dir)
+
+        if not (self.clone_dir / ".git").is_dir():
+            run(["git", "init", "-q"])
+            run(["git", "remote", "add", "origin", self.repository])
+        else:
+            run(["git", "remote", "set-url", "origin", self.repository])
+
+        remote = run(
+            ["git", "ls-remote", "--exit-code", "--heads", "origin", "gh-pages"],
+            check=False,
+            capture_output=True,
+        )
+
+        if remote.returncode == 0:
+            fetch = ["git", "fetch", "-q", "origin", "gh-pages"]
+            if self.depth:
+                fetch[3:3] = ["--depth", str(self.depth)]
+
+            run(fetch)
+            run(["git", "checkout", "-q", "-B", "gh-pages", "FETCH_HEAD"])
+            run(["git", "reset", "-q", "--hard", "FETCH_HEAD"])
+        elif remote.returncode == 2:
+            # the branch doesn't exist on the remote yet
+            run(["git", "symbolic-ref", "HEAD", "refs/heads/gh-pages"])
+            run(["git", "update-ref", "-d", "refs/heads/gh-pages"])
+            run(["git", "read-tree", "--empty"])
+        else:
+            raise subprocess.CalledProcessError(remote.returncode, remote.args)
+
+        run(["git", "clean", "-q", "-f", "-d", "-x"])
+
+        self.sync()
+
+        run(["git", "add", "-A"])
+
+        if run(["git", "diff", "--cached", "--quiet"], check=False).returncode == 0:
+            return False
+
+        run(["git", "commit", "-q", "-m", "Update GitHub Pages"])
+        run(["git", "push", "-q", "origin", "gh-pages"])
+
+        return True
+
+    def tracked_files(self):
+        output = subprocess.run(
+            ["git", "ls-files", "-s", "-z"],
+            check=True,
+            cwd=self.clone_dir,
+            capture_output=True,
+        ).stdout.decode()
+
+        tracked = {}
+
+        for line in filter(None, output.split("\0")):
+            info, _, path = line.partition("\t")
+            tracked[path] = info.split()[1]
+
+        return tracked
+
+    def sync(self):
+        tracked = self.tracked_files()
+        uploaded = {}
+
+        for directory, _, filenames in os.walk(self.upload_dir):
+            relative_dir = Path(directory).relative_to(self.upload_dir)
+
+            for filename in filenames:
+                uploaded[(relative_dir / filename).as_posix()] = Path(
+                    directory, filename
+                )
+
+        for relative in tracked.keys() - uploaded.keys():
+            path = self.clone_dir / relative
+            path.unlink()
+
+            for parent in path.parents:
+                if parent == self.clone_dir or any(parent.iterdir()):
+                    break
+                parent.rmdir()
+
+        for relative, source in uploaded.items():
+            if tracked.get(relative) == blob_hash(source):
+                continue
+
+            destination = self.clone_dir / relative
+            if destination.is_dir():
+                shutil.rmtree(destination)
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(source, destination)
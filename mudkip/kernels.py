@@ -0,0 +1,296 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+
+from docutils import nodes
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+
+def read_notebook(path):
+    import nbformat
+
+    return nbformat.read(str(path), as_version=4)
+
+
+def kernel_name(nb):
+    return nb.metadata.get("kernelspec", {}).get("name", "python3")
+
+
+class KernelPool:
+    def __init__(self, size=1):
+        self.size = size
+        self.kernels = {}
+        self.lock = Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max(size, 1))
+        self.closed = False
+
+    def start(self, name, cwd):
+        from jupyter_client import KernelManager
+
+        km = KernelManager(kernel_name=name)
+        km.start_kernel(cwd=cwd)
+        return km
+
+    def warm(self, name, cwd):
+        try:
+            km = self.start(name, cwd)
+        except Exception:
+            return
+
+        with self.lock:
+            if not self.closed:
+                self.kernels.setdefault(name, []).append(km)
+                return
+
+        km.shutdown_kernel(now=True)
+
+    def chdir(self, km, cwd):
+        if km.kernel_spec.language != "python":
+            return False
+
+        client = km.client()
+        client.start_channels()
+
+        # doesn't leave anything in the namespace of the notebook
+        code = f"__import__('os').chdir({cwd!r})"
+
+        try:
+            reply = client.execute_interactive(
+                code, silent=True, store_history=False, timeout=10
+            )
+            return reply["content"]["status"] == "ok"
+        except Exception:
+            return False
+        finally:
+            client.stop_channels()
+
+    def acquire(self, name, cwd):
+        # warm kernels are shared by every directory and moved where they're needed
+        with self.lock:
+            warm = self.kernels.get(name)
+            km = warm.pop() if warm else None
+
+        if km is not None and not (km.is_alive() and self.chdir(km, cwd)):
+            self.release(km)
+            km = None
+
+        if km is None:
+            km = self.start(name, cwd)
+
+        self.prewarm(name, cwd)
+
+        return km
+
+    def prewarm(self, name, cwd):
+        with self.lock:
+            if not self.closed and len(self.kernels.get(name, ())) < self.size:
+                self.executor.submit(self.warm, name, cwd)
+
+    def release(self, km):
+        with self.lock:
+            if not self.closed:
+                self.executor.submit(km.shutdown_kernel, now=True)
+                return
+
+        km.shutdown_kernel(now=True)
+
+    def shutdown(self):
+        with self.lock:
+            self.closed = True
+            kernels = [km for warm in self.kernels.values() for km in warm]
+            self.kernels.clear()
+
+        self.executor.shutdown(wait=True)
+
+        for km in kernels:
+            km.shutdown_kernel(now=True)
+
+
+class NotebookExecutor:
+    def __init__(
+        self, cache_path, workers=1, timeout=30, allow_errors=True, on_executed=None
+    ):
+        self.cache_path = cache_path
+        self.timeout = timeout
+        self.allow_errors = allow_errors
+        self.on_executed = on_executed
+        self.pool = KernelPool(workers)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = Lock()
+        self.running = set()
+        self.rerun = set()
+        self.failed = {}
+        self.futures = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def failures(self):
+        with self.lock:
+            return dict(self.failed)
+
+    def failure(self, path):
+        with self.lock:
+            mtime, message = self.failed.get(os.path.realpath(path), (None, None))
+
+        try:
+            if mtime == os.stat(path).st_mtime_ns:
+                return message
+        except OSError:
+            pass
+
+        return None
+
+    def outdated(self, path):
+        from jupyter_cache import get_cache
+
+        try:
+            get_cache(self.cache_path).match_cache_notebook(read_notebook(path))
+        except KeyError:
+            return True
+        except Exception:
+            return False
+
+        return False
+
+    def submit(self, paths):
+        for path in paths:
+            path = os.path.realpath(path)
+
+            with self.lock:
+                if path in self.running:
+                    self.rerun.add(path)
+                    continue
+                self.running.add(path)
+
+            future = self.executor.submit(self.execute, path)
+            self.futures.add(future)
+            future.add_done_callback(self.futures.discard)
+
+    def execute(self, path):
+        from jupyter_cache import get_cache
+        from jupyter_cache.base import CacheBundleIn
+        from nbclient import NotebookClient
+
+        mtime = None
+
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            nb = read_notebook(path)
+            km = self.pool.acquire(kernel_name(nb), str(Path(path).parent))
+
+            try:
+                start = time.perf_counter()
+                NotebookClient(
+                    nb,
+                    km=km,
+                    timeout=self.timeout,
+                    allow_errors=self.allow_errors,
+                    record_timing=False,
+                ).execute()
+                duration = time.perf_counter() - start
+            finally:
+                self.pool.release(km)
+
+            get_cache(self.cache_path).cache_notebook_bundle(
+                CacheBundleIn(nb, path, data={"execution_seconds": duration}),
+                check_validity=False,
+                overwrite=True,
+            )
+            with self.lock:
+                self.failed.pop(path, None)
+        except Exception as exc:
+            # reported by the next build, logging from this thread could end up
+            # in the warnings of a build running at the same time
+            message = f"Executing notebook failed: {exc.__class__.__name__}"
+            with self.lock:
+                self.failed[path] = mtime, message
+        finally:
+            with self.lock:
+                self.running.discard(path)
+                rerun = path in self.rerun
+                self.rerun.discard(path)
+
+        if rerun:
+            self.submit([path])
+        elif self.on_executed:
+            self.on_executed(path)
+
+    def shutdown(self):
+        for future in list(self.futures):
+            future.cancel()
+
+        self.executor.shutdown(wait=False)
+        self.pool.shutdown()
+
+
+def schedule_notebooks(app, env, docnames):
+    restore_excludepatterns(app, env)
+    app.mudkip_pending_notebooks = set()
+
+    executor = app.mudkip_notebook_executor
+    nb_config = getattr(env, "mystnb_config", None)
+
+    if not executor or not nb_config or nb_config.execution_mode != "cache":
+        return
+
+    original = nb_config.execution_excludepatterns
+    patterns = list(original)
+
+    # failed notebooks aren't executed during the build either
+    for docname in docnames:
+        path = env.doc2path(docname)
+        if not path.endswith(".ipynb"):
+            continue
+
+        if message := executor.failure(path):
+            logger.warning(message, location=docname)
+        elif executor.outdated(path):
+            app.mudkip_pending_notebooks.add(docname)
+        else:
+            continue
+
+        patterns.append(Path(path).as_posix())
+
+    if len(patterns) > len(original):
+        app.mudkip_excludepatterns = original
+        env.mystnb_config = nb_config.copy(execution_excludepatterns=tuple(patterns))
+
+
+def restore_excludepatterns(app, env):
+    if app.mudkip_excludepatterns is not None:
+        patterns, app.mudkip_excludepatterns = app.mudkip_excludepatterns, None
+        env.mystnb_config = env.mystnb_config.copy(execution_excludepatterns=patterns)
+
+
+def mark_pending_notebook(app, doctree):
+    if app.env.docname not in app.mudkip_pending_notebooks:
+        return
+
+    note = nodes.note()
+    note += nodes.paragraph(
+        text="The outputs of this notebook are outdated. "
+        "The page will reload once the notebook is done executing."
+    )
+
+    section = doctree.next_node(nodes.section)
+    parent = section or doctree
+    index = 1 if section and isinstance(section[0], nodes.title) else 0
+    parent.insert(index, note)
+
+
+def setup_notebook_executor(app):
+    app.mudkip_notebook_executor = None
+    app.mudkip_pending_notebooks = set()
+    app.mudkip_excludepatterns = None
+
+    app.connect("env-before-read-docs", schedule_notebooks)
+    app.connect("env-updated", restore_excludepatterns)
+    app.connect("doctree-read", mark_pending_notebook)
@@ -0,0 +1,163 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from os import path
+from pathlib import Path
+from threading import Lock, Semaphore
+from urllib.parse import urlparse
+
+import requests
+import sphinx.util.requests
+from requests.adapters import HTTPAdapter
+from sphinx.builders.linkcheck import (
+    CheckExternalLinksBuilder,
+    CheckResult,
+    HyperlinkAvailabilityChecker,
+)
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = {"working": 168, "redirected": 24, "broken": 1}
+
+
+def is_remote(uri):
+    return uri.startswith(("http:", "https:"))
+
+
+class LinkCache:
+    def __init__(self, filename, ttl=None, recheck=False):
+        self.filename = Path(filename)
+        self.ttl = {**DEFAULT_TTL, **(ttl or {})}
+        self.recheck = recheck
+        self.entries = self.load()
+
+    def load(self):
+        try:
+            entries = json.loads(self.filename.read_text())
+        except (OSError, ValueError):
+            return {}
+
+        return {uri: entry for uri, entry in entries.items() if is_remote(uri)}
+
+    def save(self):
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.filename.with_name(self.filename.name + ".tmp")
+        temporary.write_text(json.dumps(self.entries, indent=2, sort_keys=True))
+        os.replace(temporary, self.filename)
+
+    def get(self, uri):
+        # local targets are cheap to check and depend on the linking document
+        if self.recheck or not is_remote(uri) or not (entry := self.entries.get(uri)):
+            return None
+
+        if time.time() - entry["checked"] > self.ttl.get(entry["status"], 0) * 3600:
+            return None
+
+        return entry
+
+    def add(self, result):
+        if result.status in self.ttl and is_remote(result.uri):
+            self.entries[result.uri] = {
+                "status": result.status,
+                "info": result.message,
+                "code": result.code,
+                "checked": time.time(),
+            }
+
+
+class LinkSession:
+    def __init__(self, pool_size, host_workers=2):
+        self.host_workers = host_workers
+        self.hosts = {}
+        self.lock = Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=host_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def host(self, url):
+        netloc = urlparse(url).netloc
+
+        with self.lock:
+            if netloc not in self.hosts:
+                self.hosts[netloc] = Semaphore(self.host_workers)
+            return self.hosts[netloc]
+
+    def request(self, method, url, **kwargs):
+        with self.host(url):
+            return self.session.request(method, url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("allow_redirects", True)
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault("allow_redirects", False)
+        return self.request("HEAD", url, **kwargs)
+
+    @contextmanager
+    def install(self):
+        # sphinx's workers still build the requests, they only go through the
+        # shared session instead of the requests module so that connections
+        # are reused
+        original = sphinx.util.requests.requests
+
+        try:
+            sphinx.util.requests.requests = self
+            yield self
+        finally:
+            sphinx.util.requests.requests = original
+            self.session.close()
+
+
+class CachedLinkCheckBuilder(CheckExternalLinksBuilder):
+    def finish(self):
+        cache = self.app.mudkip_link_cache
+        checker = HyperlinkAvailabilityChecker(self.env, self.config)
+        session = LinkSession(
+            self.config.linkcheck_workers, self.app.mudkip_link_host_workers
+        )
+
+        results = []
+        pending = {}
+
+        for key, hyperlink in self.hyperlinks.items():
+            uri, docname, lineno = hyperlink
+            if cache and not checker.is_ignored_uri(uri) and (entry := cache.get(uri)):
+                status, info, code = entry["status"], entry["info"], entry["code"]
+                results.append(CheckResult(uri, docname, lineno, status, info, code))
+            else:
+                pending[key] = hyperlink
+
+        if results:
+            logger.info(f"{len(results)} links skipped (checked recently)")
+
+        logger.info("")
+
+        output_text = path.join(self.outdir, "output.txt")
+        output_json = path.join(self.outdir, "output.json")
+
+        with open(output_text, "w", encoding="utf-8") as self.txt_outfile, open(
+            output_json, "w", encoding="utf-8"
+        ) as self.json_outfile:
+            try:
+                with session.install():
+                    for result in checker.check(pending):
+                        if cache:
+                            cache.add(result)
+                        self.process_result(result)
+            finally:
+                if cache:
+                    cache.save()
+
+            for result in results:
+                self.process_result(result)
+
+        if self.broken_hyperlinks:
+            self.app.statuscode = 1
@@ -0,0 +1,77 @@
+import json
+import os
+from hashlib import sha256
+from pathlib import Path
+
+
+class SourceManifest:
+    def __init__(self, filename, root):
+        self.filename = Path(filename)
+        self.root = root
+
+        try:
+            data = json.loads(self.filename.read_text())
+        except (OSError, ValueError):
+            data = {}
+
+        self.files = data.get("files", {})
+        self.docs = data.get("docs", {})
+        self.current = {}
+
+    def reset(self):
+        self.current = {}
+
+    def key(self, filename):
+        # relative to the root so that the manifest survives moving the checkout
+        filename = os.path.normpath(os.path.join(self.root, filename))
+        return Path(os.path.relpath(filename, self.root)).as_posix()
+
+    def hash(self, filename):
+        if filename in self.current:
+            return self.current[filename]
+
+        try:
+            stat = os.stat(os.path.join(self.root, filename))
+        except OSError:
+            self.current[filename] = None
+            return None
+
+        entry = self.files.get(filename)
+
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            digest = entry[2]
+        else:
+            try:
+                content = Path(self.root, filename).read_bytes()
+                digest = sha256(content).hexdigest()
+            except OSError:
+                digest = None
+            self.files[filename] = [stat.st_mtime_ns, stat.st_size, digest]
+
+        self.current[filename] = digest
+        return digest
+
+    def changed(self, docname):
+        recorded = self.docs.get(docname)
+
+        if recorded is None:
+            return True
+
+        return any(
+            self.hash(filename) != digest for filename, digest in recorded.items()
+        )
+
+    def record(self, docname, filenames):
+        keys = {self.key(filename) for filename in filenames}
+        self.docs[docname] = {key: self.hash(key) for key in keys}
+
+    def save(self, docnames):
+        self.docs = {d: files for d, files in self.docs.items() if d in docnames}
+
+        used = {filename for files in self.docs.values() for filename in files}
+        self.files = {f: entry for f, entry in self.files.items() if f in used}
+
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.filename.with_name(self.filename.name + ".tmp")
+        temporary.write_text(json.dumps({"files": self.files, "docs": self.docs}))
+        os.replace(temporary, self.filename)
@@ -0,0 +1,509 @@
+import re
+from types import MethodType
+
+from docutils import nodes
+from docutils.writers import Writer
+from sphinx.util.docutils import SphinxTranslator
+from sphinx.writers.html5 import HTML5Translator
+
+ESCAPE_REGEX = re.compile(r"([\\`*_\[\]<>|])")
+BLANK_LINES_REGEX = re.compile(r"\n{3,}")
+
+CONTAINERS = {
+    "note": "info",
+    "hint": "info",
+    "seealso": "info",
+    "tip": "tip",
+    "attention": "warning",
+    "caution": "warning",
+    "warning": "warning",
+    "danger": "danger",
+    "error": "danger",
+    "important": "danger",
+}
+
+
+def escape(text):
+    return ESCAPE_REGEX.sub(r"\\\1", text)
+
+
+def indent(text, first, rest):
+    lines = text.split("\n")
+    return "\n".join(
+        [first + lines[0]] + [rest + line if line else line for line in lines[1:]]
+    )
+
+
+class MarkdownWriter(Writer):
+    supported = ("markdown",)
+
+    def __init__(self, builder):
+        super().__init__()
+        self.builder = builder
+
+    def translate(self):
+        visitor = self.builder.create_translator(self.document, self.builder)
+        self.document.walkabout(visitor)
+        self.output = visitor.astext()
+
+
+class MarkdownTranslator(SphinxTranslator):
+    def __init__(self, document, builder):
+        super().__init__(document, builder)
+        self.body = []
+        self.buffers = []
+        self.section_level = 0
+        self.list_markers = []
+        self.html_translator = None
+
+    def astext(self):
+        text = BLANK_LINES_REGEX.sub("\n\n", "".join(self.body))
+        return text.strip() + "\n"
+
+    def add(self, text):
+        self.body.append(text)
+
+    def add_block(self, text):
+        self.body.append(f"\n\n{text}\n\n")
+
+    def push(self):
+        self.buffers.append(self.body)
+        self.body = []
+
+    def pop(self):
+        text = BLANK_LINES_REGEX.sub("\n\n", "".join(self.body)).strip()
+        self.body = self.buffers.pop()
+        return text
+
+    def add_anchors(self, node):
+        for id in node.get("ids", ()):
+            self.add(f'<a id="{id}"></a>')
+
+    def create_html_translator(self):
+        translator = HTML5Translator(self.document, self.builder)
+        handlers = self.builder.app.registry.translation_handlers.get("html", {})
+
+        for name, (visit, depart) in handlers.items():
+            setattr(translator, "visit_" + name, MethodType(visit, translator))
+            if depart:
+                setattr(translator, "depart_" + name, MethodType(depart, translator))
+
+        return translator
+
+    def unknown_visit(self, node):
+        if not self.html_translator:
+            self.html_translator = self.create_html_translator()
+
+        translator = self.html_translator
+        translator.body = []
+        node.walkabout(translator)
+        html = "".join(translator.body).strip()
+
+        if isinstance(node, (nodes.Inline, nodes.TextElement)) and not isinstance(
+            node, nodes.Structural
+        ):
+            self.add(html)
+        else:
+            self.add_block(html)
+
+        raise nodes.SkipNode
+
+    def ignore(self, node):
+        raise nodes.SkipNode
+
+    def visit_Text(self, node):
+        text = node.astext()
+        self.add(escape(text.replace("\n", " ")))
+
+    def depart_Text(self, node):
+        pass
+
+    def visit_document(self, node):
+        pass
+
+    def depart_document(self, node):
+        pass
+
+    def visit_section(self, node):
+        self.section_level += 1
+
+    def depart_section(self, node):
+        self.section_level -= 1
+
+    def visit_title(self, node):
+        self.push()
+
+    def depart_title(self, node):
+        title = self.pop()
+        parent = node.parent
+
+        if isinstance(parent, nodes.section):
+            ids = parent.get("ids", [])
+            anchor = f" {{#{ids[0]}}}" if ids else ""
+            self.add_block(f"{'#' * min(self.section_level, 6)} {title}{anchor}")
+            for id in ids[1:]:
+                self.add_block(f'<a id="{id}"></a>')
+        elif isinstance(parent, nodes.Admonition):
+            self.admonition_title = title
+        else:
+            self.add_block(f"**{title}**")
+
+    def visit_subtitle(self, node):
+        self.push()
+
+    def depart_subtitle(self, node):
+        self.add_block(f"**{self.pop()}**")
+
+    def visit_rubric(self, node):
+        self.push()
+
+    def depart_rubric(self, node):
+        self.add_block(f"**{self.pop()}**")
+
+    def visit_paragraph(self, node):
+        self.add("\n\n")
+        self.add_anchors(node)
+
+    def depart_paragraph(self, node):
+        self.add("\n\n")
+
+    visit_compact_paragraph = visit_paragraph
+    depart_compact_paragraph = depart_paragraph
+
+    def visit_inline(self, node):
+        self.add_anchors(node)
+
+    def depart_inline(self, node):
+        pass
+
+    def visit_container(self, node):
+        self.add_anchors(node)
+
+    def depart_container(self, node):
+        pass
+
+    visit_compound = visit_container
+    depart_compound = depart_container
+    visit_topic = visit_container
+    depart_topic = depart_container
+    visit_desc_content = visit_container
+    depart_desc_content = depart_container
+
+    def visit_emphasis(self, node):
+        self.add("*")
+
+    def depart_emphasis(self, node):
+        self.add("*")
+
+    visit_title_reference = visit_emphasis
+    depart_title_reference = depart_emphasis
+    visit_literal_emphasis = visit_emphasis
+    depart_literal_emphasis = depart_emphasis
+
+    def visit_strong(self, node):
+        self.add("**")
+
+    def depart_strong(self, node):
+        self.add("**")
+
+    visit_literal_strong = visit_strong
+    depart_literal_strong = depart_strong
+
+    def visit_literal(self, node):
+        text = node.astext()
+        fence = "``" if "`" in text else "`"
+        padding = " " if text.startswith("`") or text.endswith("`") else ""
+        self.add(f"{fence}{padding}{text}{padding}{fence}")
+        raise nodes.SkipNode
+
+    def visit_subscript(self, node):
+        self.add("<sub>")
+
+    def depart_subscript(self, node):
+        self.add("</sub>")
+
+    def visit_superscript(self, node):
+        self.add("<sup>")
+
+    def depart_superscript(self, node):
+        self.add("</sup>")
+
+    def visit_reference(self, node):
+        self.push()
+
+    def depart_reference(self, node):
+        text = self.pop()
+        uri = node.get("refuri") or "#" + node.get("refid", "")
+        self.add(f"[{text}]({uri.replace(' ', '%20')})")
+
+    visit_download_reference = visit_reference
+    depart_download_reference = depart_reference
+    visit_number_reference = visit_reference
+    depart_number_reference = depart_reference
+
+    def visit_literal_block(self, node):
+        language = node.get("language", "")
+        if language == "default":
+            language = self.config.highlight_language or ""
+        code = node.astext().rstrip("\n")
+        fence = "````" if "```" in code else "```"
+        self.add_block(f"{fence}{language}\n{code}\n{fence}")
+        raise nodes.SkipNode
+
+    visit_doctest_block = visit_literal_block
+
+    def visit_bullet_list(self, node):
+        self.add("\n\n")
+        self.list_markers.append(None)
+
+    def depart_bullet_list(self, node):
+        self.add("\n")
+        self.list_markers.pop()
+
+    def visit_enumerated_list(self, node):
+        self.add("\n\n")
+        self.list_markers.append(node.get("start", 1))
+
+    depart_enumerated_list = depart_bullet_list
+
+    def visit_list_item(self, node):
+        self.push()
+
+    def depart_list_item(self, node):
+        number = self.list_markers[-1]
+
+        if number is None:
+            marker = "- "
+        else:
+            marker = f"{number}. "
+            self.list_markers[-1] += 1
+
+        self.add(indent(self.pop(), marker, " " * len(marker)) + "\n")
+
+    def visit_definition_list(self, node):
+        pass
+
+    def depart_definition_list(self, node):
+        pass
+
+    def visit_definition_list_item(self, node):
+        self.add_anchors(node)
+
+    def depart_definition_list_item(self, node):
+        pass
+
+    def visit_term(self, node):
+        self.push()
+        self.add_anchors(node)
+
+    def depart_term(self, node):
+        self.add_block(f"**{self.pop()}**")
+
+    def visit_classifier(self, node):
+        self.add(" : ")
+
+    def depart_classifier(self, node):
+        pass
+
+    def visit_definition(self, node):
+        pass
+
+    def depart_definition(self, node):
+        pass
+
+    def visit_field_list(self, node):
+        pass
+
+    def depart_field_list(self, node):
+        pass
+
+    def visit_field(self, node):
+        pass
+
+    def depart_field(self, node):
+        pass
+
+    def visit_field_name(self, node):
+        self.push()
+
+    def depart_field_name(self, node):
+        self.add_block(f"**{self.pop()}:**")
+
+    def visit_field_body(self, node):
+        pass
+
+    def depart_field_body(self, node):
+        pass
+
+    def visit_block_quote(self, node):
+        self.push()
+
+    def depart_block_quote(self, node):
+        self.add_block(indent(self.pop(), "> ", "> ").replace("\n\n", "\n>\n"))
+
+    def visit_attribution(self, node):
+        self.add("\n\n— ")
+
+    def depart_attribution(self, node):
+        self.add("\n\n")
+
+    def visit_Admonition(self, node):
+        self.push()
+        self.admonition_title = ""
+
+    def depart_Admonition(self, node):
+        text = self.pop()
+        name = node.__class__.__name__
+        kind = CONTAINERS.get(name, "info")
+        title = self.admonition_title or (
+            name.capitalize() if name in CONTAINERS else ""
+        )
+        self.add_block(f"::: {kind} {title}".rstrip() + f"\n{text}\n:::")
+
+    def visit_line_block(self, node):
+        self.push()
+
+    def depart_line_block(self, node):
+        text = self.pop()
+        if isinstance(node.parent, nodes.line_block):
+            self.add(text + "<br>\n")
+        else:
+            text = text.rstrip("\n")
+            self.add_block(text[:-4] if text.endswith("<br>") else text)
+
+    def visit_line(self, node):
+        pass
+
+    def depart_line(self, node):
+        self.add("<br>\n")
+
+    def visit_transition(self, node):
+        self.add_block("---")
+        raise nodes.SkipNode
+
+    def visit_image(self, node):
+        alt = escape(node.get("alt", ""))
+        self.add(f"![{alt}]({node['uri']})")
+        raise nodes.SkipNode
+
+    def visit_figure(self, node):
+        self.add("\n\n")
+        self.add_anchors(node)
+
+    def depart_figure(self, node):
+        self.add("\n\n")
+
+    def visit_caption(self, node):
+        self.push()
+
+    def depart_caption(self, node):
+        self.add_block(f"*{self.pop()}*")
+
+    visit_legend = visit_container
+    depart_legend = depart_container
+
+    def visit_math(self, node):
+        self.add(f"${node.astext()}$")
+        raise nodes.SkipNode
+
+    def visit_math_block(self, node):
+        self.add_block(f"$$\n{node.astext().strip()}\n$$")
+        raise nodes.SkipNode
+
+    def visit_raw(self, node):
+        if "html" in node.get("format", "").split():
+            self.add_block(node.astext())
+        raise nodes.SkipNode
+
+    def visit_table(self, node):
+        for entry in node.findall(nodes.entry):
+            if entry.get("morerows") or entry.get("morecols"):
+                self.unknown_visit(node)
+
+        self.table_rows = []
+        self.table_heads = 0
+        self.add_anchors(node)
+
+    def depart_table(self, node):
+        rows = self.table_rows
+        if not rows:
+            return
+
+        width = max(len(row) for row in rows)
+        rows = [row + [""] * (width - len(row)) for row in rows]
+
+        if self.table_heads:
+            head, rows = rows[0], rows[1:]
+        else:
+            head = [""] * width
+
+        lines = [head, ["---"] * width] + rows
+        self.add_block("\n".join("| " + " | ".join(line) + " |" for line in lines))
+
+    def visit_tgroup(self, node):
+        pass
+
+    def depart_tgroup(self, node):
+        pass
+
+    def visit_colspec(self, node):
+        raise nodes.SkipNode
+
+    def visit_thead(self, node):
+        self.table_heads += 1
+
+    def depart_thead(self, node):
+        pass
+
+    def visit_tbody(self, node):
+        pass
+
+    def depart_tbody(self, node):
+        pass
+
+    def visit_row(self, node):
+        self.table_rows.append([])
+
+    def depart_row(self, node):
+        pass
+
+    def visit_entry(self, node):
+        self.push()
+
+    def depart_entry(self, node):
+        text = self.pop().replace("\n\n", "<br>").replace("\n", " ")
+        self.table_rows[-1].append(text)
+
+    def visit_desc(self, node):
+        self.add("\n\n")
+
+    def depart_desc(self, node):
+        self.add("\n\n")
+
+    def visit_desc_signature(self, node):
+        self.add("\n\n")
+        self.add_anchors(node)
+        signature = node.astext().replace("\n", " ").strip()
+        self.add(f"**`{signature}`**\n\n")
+        raise nodes.SkipNode
+
+    def visit_versionmodified(self, node):
+        self.add("\n\n")
+
+    def depart_versionmodified(self, node):
+        self.add("\n\n")
+
+    def visit_target(self, node):
+        if not node.get("refuri"):
+            self.add_anchors(node)
+        raise nodes.SkipNode
+
+    visit_comment = ignore
+    visit_substitution_definition = ignore
+    visit_meta = ignore
+    visit_index = ignore
+    visit_toctree = ignore
+    visit_only = ignore
+    visit_system_message = ignore
+    visit_problematic = ignore
+    visit_pending_xref = ignore
@@ -0,0 +1,108 @@
+import shutil
+import sys
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+from .fingerprint import fingerprint
+
+
+@lru_cache(maxsize=None)
+def environment_fingerprint():
+    from importlib.metadata import distributions
+
+    packages = sorted(
+        f"{dist.metadata['Name']}=={dist.version}" for dist in distributions()
+    )
+    return fingerprint({"python": sys.version, "packages": packages})
+
+
+def directory_size(directory):
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+
+class NotebookCache:
+    def __init__(self, directory, max_age=None, max_size=None):
+        self.directory = Path(directory)
+        self.max_age = max_age
+        self.max_size = max_size
+
+    def path(self, allow_errors=True):
+        key = fingerprint([environment_fingerprint(), allow_errors])
+        return self.directory / key[:16]
+
+    def partitions(self):
+        if not self.directory.is_dir():
+            return []
+        return sorted(path for path in self.directory.iterdir() if path.is_dir())
+
+    def records(self, partition):
+        from jupyter_cache import get_cache
+
+        cache = get_cache(partition)
+        executed = partition / "executed"
+
+        return cache, [
+            (record, directory_size(executed / record.hashkey))
+            for record in cache.list_cache_records()
+        ]
+
+    def stats(self):
+        current = {self.path(True), self.path(False)}
+        stats = []
+
+        for partition in self.partitions():
+            _, records = self.records(partition)
+            stats.append(
+                {
+                    "path": partition,
+                    "current": partition in current,
+                    "notebooks": len(records),
+                    "size": directory_size(partition),
+                    "accessed": max(
+                        (record.accessed for record, _ in records), default=None
+                    ),
+                }
+            )
+
+        return stats
+
+    def prune(self, max_age=None, max_size=None, everything=False):
+        max_age = self.max_age if max_age is None else max_age
+        max_size = self.max_size if max_size is None else max_size
+
+        partitions = self.partitions()
+
+        if not partitions:
+            return 0, 0
+
+        current = {self.path(True), self.path(False)}
+        removed = 0
+        freed = 0
+
+        for partition in partitions:
+            if everything or partition not in current:
+                executed = partition / "executed"
+                removed += len(list(executed.iterdir())) if executed.is_dir() else 0
+                freed += directory_size(partition)
+                shutil.rmtree(partition)
+                continue
+
+            cache, records = self.records(partition)
+            records.sort(key=lambda item: item[0].accessed, reverse=True)
+
+            deadline = max_age and datetime.utcnow() - timedelta(days=max_age)
+            budget = max_size and max_size * 1024 * 1024
+            total = 0
+
+            for record, size in records:
+                total += size
+                if (deadline and record.accessed < deadline) or (
+                    budget and total > budget
+                ):
+                    cache.remove_cache(record.pk)
+                    removed += 1
+                    freed += size
+                    total -= size
+
+        return removed, freed
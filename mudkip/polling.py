@@ -0,0 +1,179 @@
+import os
+import re
+from fnmatch import translate
+from threading import Event, RLock, Thread
+
+from watchdog.events import (
+    DirCreatedEvent,
+    DirDeletedEvent,
+    FileCreatedEvent,
+    FileDeletedEvent,
+    FileModifiedEvent,
+)
+
+
+class IndexedDirectory:
+    def __init__(self, handler, recursive, mtime):
+        self.handler = handler
+        self.recursive = recursive
+        self.mtime = mtime
+        self.subdirs = set()
+        self.files = set()
+
+
+class SnapshotObserver:
+    def __init__(self, watcher, interval=1):
+        self.watcher = watcher
+        self.interval = interval
+        self.directories = {}
+        self.files = {}
+        self.filename_regex = {}
+        self.lock = RLock()
+        self.stopped = Event()
+        self.thread = Thread(target=self.run, daemon=True)
+
+    def schedule(self, handler, path, recursive=False):
+        with self.lock:
+            if path not in self.directories:
+                self.index(handler, path, recursive, self.thread.is_alive())
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def join(self):
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.scan()
+
+    def filename_matcher(self, handler):
+        if handler not in self.filename_regex:
+            patterns = handler.patterns or ["*"]
+            flags = 0 if handler.case_sensitive else re.IGNORECASE
+            regex = re.compile("|".join(map(translate, patterns)), flags)
+            self.filename_regex[handler] = regex.match
+
+        return self.filename_regex[handler]
+
+    def listdir(self, handler, path):
+        subdirs, files = set(), {}
+
+        pruned = self.watcher.pruned
+        kept = self.watcher.kept
+        ignored = self.watcher.matchers[handler.root]
+        matches = self.filename_matcher(handler)
+
+        # the directory itself isn't ignored so only the entry names need checking
+        prefix = os.path.relpath(path, handler.root).replace(os.sep, "/") + "/"
+        prefix = "" if prefix == "./" else prefix
+
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not pruned(handler.root, entry.path):
+                            subdirs.add(entry.path)
+                    elif matches(entry.name) and (
+                        kept(entry.path) or not ignored(prefix + entry.name)
+                    ):
+                        stat = entry.stat(follow_symlinks=False)
+                        files[entry.path] = stat.st_mtime_ns, stat.st_size
+                except OSError:
+                    pass
+
+        return subdirs, files
+
+    def index(self, handler, path, recursive, emit):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            subdirs, files = self.listdir(handler, path)
+        except OSError:
+            return
+
+        directory = self.directories[path] = IndexedDirectory(handler, recursive, mtime)
+        directory.subdirs = subdirs
+        directory.files = set(files)
+        self.files.update(files)
+
+        if emit:
+            for filename in files:
+                handler.dispatch(FileCreatedEvent(filename))
+
+        if recursive:
+            for subdir in subdirs:
+                self.index(handler, subdir, recursive, emit)
+
+    def remove(self, path):
+        directory = self.directories.pop(path, None)
+
+        if directory is None:
+            return
+
+        for filename in directory.files:
+            self.files.pop(filename, None)
+            directory.handler.dispatch(FileDeletedEvent(filename))
+
+        for subdir in directory.subdirs:
+            self.remove(subdir)
+
+        directory.handler.dispatch(DirDeletedEvent(path))
+
+    def refresh(self, path, directory, mtime):
+        handler = directory.handler
+        directory.mtime = mtime
+
+        try:
+            subdirs, files = self.listdir(handler, path)
+        except OSError:
+            return
+
+        for filename in directory.files - files.keys():
+            self.files.pop(filename, None)
+            handler.dispatch(FileDeletedEvent(filename))
+
+        for filename in files.keys() - directory.files:
+            self.files[filename] = files[filename]
+            handler.dispatch(FileCreatedEvent(filename))
+
+        for subdir in directory.subdirs - subdirs:
+            self.remove(subdir)
+
+        added = subdirs - directory.subdirs
+        directory.subdirs = subdirs
+        directory.files = set(files)
+
+        for subdir in added:
+            if directory.recursive:
+                self.index(handler, subdir, True, True)
+            handler.dispatch(DirCreatedEvent(subdir))
+
+    def scan(self):
+        with self.lock:
+            for path in list(self.directories):
+                if not (directory := self.directories.get(path)):
+                    continue
+
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+
+                # the mtime of a directory only changes when entries are added or removed
+                if mtime != directory.mtime:
+                    self.refresh(path, directory, mtime)
+
+                for filename in directory.files:
+                    try:
+                        stat = os.stat(filename)
+                    except OSError:
+                        continue
+
+                    signature = stat.st_mtime_ns, stat.st_size
+
+                    if self.files.get(filename) != signature:
+                        self.files[filename] = signature
+                        directory.handler.dispatch(FileModifiedEvent(filename))
@@ -1,4 +1,7 @@
-from .server import livereload_dev_server
+def livereload_dev_server(directory, host, port):
+    from . import server
+
+    return server.livereload_dev_server(directory, host, port)
 
 
 def preset(func):
@@ -0,0 +1,255 @@
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+from pathlib import Path
+
+DOCUMENT_CATEGORIES = ("read", "resolve", "write")
+DOCUMENT_SPANS = DOCUMENT_CATEGORIES + ("autodoc",)
+
+
+def clock():
+    times = os.times()
+    cpu = time.process_time() + times.children_user + times.children_system
+    return time.perf_counter(), cpu
+
+
+class Profiler:
+    def __init__(self):
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.pending = {}
+        self.env = None
+
+    def record(self, name, category, docname, start):
+        start_wall, start_cpu = start
+        end_wall, end_cpu = clock()
+
+        span = {
+            "name": name,
+            "category": category,
+            "docname": docname,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "start": start_wall - self.origin,
+            "wall": end_wall - start_wall,
+            "cpu": end_cpu - start_cpu,
+        }
+
+        if os.getpid() == self.pid:
+            self.spans.append(span)
+        elif self.env is not None:
+            # spans recorded in parallel readers travel back with the environment
+            self.env.__dict__.setdefault("mudkip_profile", []).append(span)
+
+    @contextmanager
+    def span(self, name, category="phase", docname=None):
+        start = clock()
+
+        try:
+            yield
+        finally:
+            self.record(name, category, docname, start)
+
+    def start(self, name):
+        self.pending[name] = clock()
+
+    def stop(self, name):
+        if name in self.pending:
+            self.record(name, "phase", None, self.pending.pop(name))
+
+    def aggregate(self, category):
+        totals = {}
+
+        for span in sorted(self.spans, key=lambda span: span["start"]):
+            if span["category"] == category:
+                total = totals.setdefault(
+                    span["name"],
+                    {"name": span["name"], "wall": 0, "cpu": 0, "count": 0},
+                )
+                total["wall"] += span["wall"]
+                total["cpu"] += span["cpu"]
+                total["count"] += 1
+
+        return list(totals.values())
+
+    def documents(self):
+        documents = {}
+
+        for span in self.spans:
+            if not span["docname"] or span["category"] not in DOCUMENT_SPANS:
+                continue
+
+            document = documents.setdefault(
+                span["docname"],
+                {"docname": span["docname"], "wall": 0, "cpu": 0},
+            )
+
+            if span["category"] in DOCUMENT_CATEGORIES:
+                document["wall"] += span["wall"]
+                document["cpu"] += span["cpu"]
+
+            category = span["category"]
+            document[category] = document.get(category, 0) + span["wall"]
+
+        return sorted(documents.values(), key=lambda d: d["wall"], reverse=True)
+
+    def summary(self):
+        return {
+            "phases": self.aggregate("phase"),
+            "hooks": self.aggregate("hook"),
+            "documents": self.documents(),
+            "spans": self.spans,
+        }
+
+    def trace(self):
+        return {
+            "traceEvents": [
+                {
+                    "name": span["name"],
+                    "cat": span["category"],
+                    "ph": "X",
+                    "ts": round(span["start"] * 1e6),
+                    "dur": round(span["wall"] * 1e6),
+                    "pid": span["pid"],
+                    "tid": span["tid"],
+                    "args": {"docname": span["docname"], "cpu": span["cpu"]},
+                }
+                for span in self.spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        summary_file = directory / "profile.json"
+        trace_file = directory / "trace.json"
+
+        summary_file.write_text(json.dumps(self.summary(), indent=2))
+        trace_file.write_text(json.dumps(self.trace()))
+
+        return summary_file, trace_file
+
+
+def timed(profiler, function, name, category, docname=None):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with profiler.span(name, category, docname(*args) if docname else None):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def patched(obj, name, value):
+    original = obj.__dict__.get(name)
+
+    try:
+        setattr(obj, name, value)
+        yield
+    finally:
+        if original is None:
+            delattr(obj, name)
+        else:
+            setattr(obj, name, original)
+
+
+@contextmanager
+def instrument(profiler, app):
+    from sphinx.environment import BuildEnvironment
+
+    builder = app.builder
+    profiler.env = app.env
+
+    def current_docname(*args):
+        return app.env.temp_data.get("docname")
+
+    def first_argument(obj, docname, *args):
+        return docname
+
+    listeners = {}
+
+    # only the hooks registered by mudkip are timed
+    for event, registered in app.events.listeners.items():
+        listeners[event] = registered
+        app.events.listeners[event] = [
+            listener._replace(
+                handler=timed(
+                    profiler,
+                    listener.handler,
+                    f"{event}: {listener.handler.__name__}",
+                    "hook",
+                    current_docname,
+                )
+            )
+            if getattr(listener.handler, "__module__", "").startswith("mudkip.")
+            and listener.handler.__module__ != __name__
+            else listener
+            for listener in registered
+        ]
+
+    patches = [
+        (builder, "read_doc", "read", lambda docname: docname),
+        (builder, "write_doc", "write", lambda docname, doctree: docname),
+        (BuildEnvironment, "get_and_resolve_doctree", "resolve", first_argument),
+    ]
+
+    if "sphinx.ext.autodoc" in app.extensions:
+        from sphinx.ext.autodoc import Documenter
+
+        patches.append((Documenter, "import_object", "autodoc", current_docname))
+
+    try:
+        with ExitStack() as stack:
+            for obj, name, category, docname in patches:
+                function = timed(
+                    profiler, getattr(obj, name), category, category, docname
+                )
+                stack.enter_context(patched(obj, name, function))
+            yield
+    finally:
+        app.events.listeners.update(listeners)
+        profiler.env = None
+
+
+def start_reading(app, env, docnames):
+    if profiler := app.mudkip_profiler:
+        profiler.start("read")
+
+
+def merge_profile(app, env, docnames, other):
+    if app.mudkip_profiler and hasattr(other, "mudkip_profile"):
+        env.__dict__.setdefault("mudkip_profile", []).extend(other.mudkip_profile)
+
+
+def finish_reading(app, env):
+    spans = env.__dict__.pop("mudkip_profile", [])
+
+    if profiler := app.mudkip_profiler:
+        profiler.spans.extend(spans)
+        profiler.stop("read")
+
+
+def start_writing(app, env):
+    if profiler := app.mudkip_profiler:
+        profiler.start("write")
+
+
+def finish_writing(app, exception):
+    if profiler := app.mudkip_profiler:
+        profiler.stop("write")
+
+
+def setup_profiling(app):
+    app.mudkip_profiler = None
+
+    app.connect("env-before-read-docs", start_reading)
+    app.connect("env-merge-info", merge_profile)
+    app.connect("env-updated", finish_reading)
+    app.connect("env-check-consistency", start_writing)
+    app.connect("build-finished", finish_writing)
@@ -0,0 +1,21 @@
+from copy import deepcopy
+
+
+def update_relations(app, env):
+    toctree = (env.config.root_doc, env.toctree_includes)
+
+    # collecting relations walks the entire toctree so only do it when it changed
+    if getattr(env, "mudkip_toctree", None) != toctree:
+        env.mudkip_relations = env.collect_relations()
+        env.mudkip_toctree = deepcopy(toctree)
+
+
+def get_relations(env):
+    if not hasattr(env, "mudkip_relations"):
+        update_relations(None, env)
+
+    return env.mudkip_relations
+
+
+def setup_relations(app):
+    app.connect("env-updated", update_relations)
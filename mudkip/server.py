@@ -1,32 +1,296 @@
-from os import path
-import logging
+import gzip
+import mimetypes
+import os
+from collections import OrderedDict
 from contextlib import contextmanager
-from multiprocessing import Process
+from hashlib import sha1
+from multiprocessing import Pipe, Process
+from urllib.parse import unquote, urlparse
 
-from livereload import Server
+from livereload.handlers import LiveReloadJSHandler
+from tornado import escape, web
+from tornado.ioloop import IOLoop
+from tornado.websocket import WebSocketHandler
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CACHE_SIZE = 64 * 1024 * 1024
+
+COMPRESSIBLE_TYPES = (
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+)
+
+# injects livereload.js from the host and port the page was loaded from
+LIVE_SCRIPT = (
+    b'<script type="text/javascript">(function(){'
+    b'var s=document.createElement("script");'
+    b"var port=window.location.port"
+    b'||(window.location.protocol=="https:"?443:80);'
+    b's.src="//"+window.location.hostname+":"+port+"/livereload.js?port="+port;'
+    b"document.head.appendChild(s);"
+    b"})();</script>"
+)
+
+
+class LivereloadDevServer:
+    def __init__(self, url, connection):
+        self.url = url
+        self.connection = connection
+
+    def reload(self, pages=None):
+        try:
+            self.connection.send(pages)
+        except OSError:
+            pass
 
 
 @contextmanager
 def livereload_dev_server(directory, host, port):
+    receiver, sender = Pipe(duplex=False)
+
     try:
         process = Process(
-            target=LivereloadServer.serve_directory, args=(directory, host, port)
+            target=serve_directory,
+            args=(directory, host, port, receiver),
         )
         process.start()
-        yield f"http://{host}:{port}"
+        yield LivereloadDevServer(f"http://{host}:{port}", sender)
     finally:
         process.terminate()
         process.join()
 
 
-class LivereloadServer(Server):
-    def _setup_logging(self):
-        super()._setup_logging()
-        logger = logging.getLogger("livereload")
-        logger.setLevel(100)
+def page_filename(url):
+    filename = unquote(urlparse(url).path).lstrip("/")
+
+    if not filename or filename.endswith("/"):
+        filename += "index.html"
+
+    return filename
+
+
+class PageReloadHandler(WebSocketHandler):
+    waiters = set()
+    page = None
+
+    def check_origin(self, origin):
+        return True
+
+    def on_message(self, message):
+        message = escape.json_decode(message)
+        command = message.get("command")
+
+        if command == "hello":
+            handshake = {
+                "command": "hello",
+                "protocols": ["http://livereload.com/protocols/official-7"],
+                "serverName": "mudkip",
+            }
+            self.write_message(handshake)
+        elif command == "info" and "url" in message:
+            self.page = page_filename(message["url"])
+            self.waiters.add(self)
+
+    def on_close(self):
+        self.waiters.discard(self)
 
     @classmethod
-    def serve_directory(cls, directory, host, port):
-        server = cls()
-        server.watch(path.join(directory, "**", "*.html"))
-        server.serve(port=port, host=host, root=directory)
+    def reload_pages(cls, pages):
+        for waiter in cls.waiters.copy():
+            if pages is not None and waiter.page not in pages:
+                continue
+
+            message = {
+                "command": "reload",
+                "path": waiter.page or "*",
+                "liveCSS": True,
+                "liveImg": True,
+            }
+
+            try:
+                waiter.write_message(message)
+            except Exception:
+                cls.waiters.discard(waiter)
+
+
+class CachedFile:
+    def __init__(self, signature, content, script):
+        if script:
+            content = content.replace(b"</head>", script + b"</head>", 1)
+
+        self.signature = signature
+        self.content = content
+        self.etag = sha1(content).hexdigest()
+        self.encoded = {}
+
+    @property
+    def size(self):
+        return len(self.content) + sum(map(len, self.encoded.values()))
+
+    def encode(self, encoding):
+        if encoding not in self.encoded:
+            if encoding == "br":
+                self.encoded[encoding] = brotli.compress(self.content)
+            else:
+                self.encoded[encoding] = gzip.compress(self.content, 6)
+
+        return self.encoded[encoding]
+
+
+class FileCache:
+    def __init__(self, max_size=CACHE_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        self.files = OrderedDict()
+
+    def get(self, filename, script=None):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            self.discard(filename)
+            return None
+
+        signature = stat.st_mtime_ns, stat.st_size
+        entry = self.files.get(filename)
+
+        if entry and entry.signature == signature:
+            self.files.move_to_end(filename)
+            return entry
+
+        try:
+            with open(filename, "rb") as f:
+                content = f.read()
+        except OSError:
+            return None
+
+        self.discard(filename)
+        entry = CachedFile(signature, content, script)
+
+        if entry.size <= self.max_size:
+            self.files[filename] = entry
+            self.resize(entry.size)
+
+        return entry
+
+    def encode(self, filename, entry, encoding):
+        if encoding == "identity":
+            return entry.content
+
+        size = entry.size
+        content = entry.encode(encoding)
+
+        if self.files.get(filename) is entry:
+            self.resize(entry.size - size)
+
+        return content
+
+    def discard(self, filename):
+        if entry := self.files.pop(filename, None):
+            self.size -= entry.size
+
+    def resize(self, delta):
+        self.size += delta
+
+        while self.size > self.max_size and self.files:
+            _, entry = self.files.popitem(last=False)
+            self.size -= entry.size
+
+
+class CachedFileHandler(web.RequestHandler):
+    def initialize(self, path, cache, script, default_filename="index.html"):
+        self.root = os.path.abspath(path)
+        self.cache = cache
+        self.script = script
+        self.default_filename = default_filename
+
+    def head(self, path):
+        return self.get(path, include_body=False)
+
+    def get(self, path, include_body=True):
+        filename = os.path.abspath(os.path.join(self.root, unquote(path)))
+
+        if filename != self.root and not filename.startswith(self.root + os.sep):
+            raise web.HTTPError(403)
+
+        if os.path.isdir(filename):
+            if path and not path.endswith("/"):
+                self.redirect(self.request.path + "/", permanent=True)
+                return
+            filename = os.path.join(filename, self.default_filename)
+
+        content_type, _ = mimetypes.guess_type(filename)
+        content_type = content_type or "application/octet-stream"
+        is_html = content_type == "text/html"
+
+        entry = self.cache.get(filename, self.script if is_html else None)
+
+        if entry is None:
+            raise web.HTTPError(404)
+
+        encoding = self.negotiate_encoding(content_type, entry)
+        etag = entry.etag if encoding == "identity" else f"{entry.etag}-{encoding}"
+
+        self.set_header("Content-Type", content_type)
+        self.set_header("Cache-Control", "no-cache")
+        self.set_header("Vary", "Accept-Encoding")
+        self.set_header("Etag", f'"{etag}"')
+
+        if self.check_etag_header():
+            self.set_status(304)
+            return
+
+        if encoding != "identity":
+            self.set_header("Content-Encoding", encoding)
+
+        if include_body:
+            self.write(self.cache.encode(filename, entry, encoding))
+
+    def negotiate_encoding(self, content_type, entry):
+        if len(entry.content) < 256 or not (
+            content_type.startswith("text/") or content_type in COMPRESSIBLE_TYPES
+        ):
+            return "identity"
+
+        accepted = self.request.headers.get("Accept-Encoding", "")
+        accepted = {value.split(";")[0].strip() for value in accepted.split(",")}
+
+        if brotli and "br" in accepted:
+            return "br"
+        elif "gzip" in accepted:
+            return "gzip"
+
+        return "identity"
+
+
+def serve_directory(directory, host, port, connection):
+    options = {"path": directory, "cache": FileCache(), "script": LIVE_SCRIPT}
+    application = web.Application(
+        [
+            (r"/livereload", PageReloadHandler),
+            (r"/livereload.js", LiveReloadJSHandler),
+            (r"/(.*)", CachedFileHandler, options),
+        ]
+    )
+    application.listen(port, address=host)
+
+    loop = IOLoop.current()
+
+    def receive(fd, events):
+        try:
+            while connection.poll():
+                PageReloadHandler.reload_pages(connection.recv())
+        except (EOFError, OSError):
+            loop.remove_handler(fd)
+
+    loop.add_handler(connection.fileno(), receive, IOLoop.READ)
+
+    try:
+        loop.start()
+    except KeyboardInterrupt:
+        pass
@@ -1,41 +1,21 @@
-import re
+import os
+import time
 from os import path
 
 from docutils.frontend import OptionParser
 from docutils.io import StringOutput
-from docutils.nodes import SkipNode
-from docutils.writers import Writer
 from sphinx.builders import Builder
-from sphinx.util.osutil import ensuredir, os_path
+from sphinx.highlighting import PygmentsBridge
+from sphinx.util import logging
+from sphinx.util.osutil import os_path
 from sphinx.writers.html import HTMLWriter
-from sphinx.writers.html5 import HTML5Translator
 
-HEADING_REGEX = re.compile(r".*(</h[123456]>).*")
+from .files import file_signature, write_if_changed
+from .manifest import SourceManifest
+from .markdown import MarkdownTranslator, MarkdownWriter
+from .relations import get_relations
 
-
-class VitePressTranslator(HTML5Translator):
-    def depart_title(self, node):
-        super().depart_title(node)
-
-        if m := HEADING_REGEX.match(self.body[-1]):
-            title = ""
-            tag = m[1].replace("/", "")
-            level = int(tag[2])
-
-            while True:
-                fragment = self.body.pop()
-                title = fragment + title
-                if tag in fragment:
-                    break
-
-            before, _, title = title.partition(tag)
-            title, _, after = title.partition(m[1])
-            self.body.append(f"{before}\n\n{'#' * level} {title}\n\n{after}")
-
-    def visit_literal_block(self, node):
-        lang = node.get("language", "")
-        self.body.append(f"\n\n```{lang}\n{node.rawsource.strip()}\n```\n\n")
-        raise SkipNode
+logger = logging.getLogger(__name__)
 
 
 class VitePressBuilder(Builder):
@@ -46,39 +26,70 @@ class VitePressBuilder(Builder):
     link_suffix = ".html"
     allow_parallel = True
 
-    default_translator_class = VitePressTranslator
+    default_translator_class = MarkdownTranslator
 
     add_permalinks = False
 
+    batch_size = 64
+
     def init(self):
-        self.highlighter = None
+        # only used by the html fallback for nodes without a markdown equivalent
+        self.highlighter = PygmentsBridge("html", self.config.pygments_style)
+        self.manifest = SourceManifest(
+            path.join(self.doctreedir, "vitepress.json"), self.srcdir
+        )
 
     def get_outdated_docs(self):
+        self.manifest.reset()
+        outdated = []
+
         for docname in self.env.found_docs:
-            if docname not in self.env.all_docs:
-                yield docname
-                continue
-            targetname = path.join(self.outdir, docname + self.out_suffix)
-            try:
-                targetmtime = path.getmtime(targetname)
-            except Exception:
-                targetmtime = 0
-            try:
-                srcmtime = path.getmtime(self.env.doc2path(docname))
-                if srcmtime > targetmtime:
-                    yield docname
-            except OSError:
-                # source doesn't exist anymore
-                pass
+            if (
+                docname not in self.env.all_docs
+                or not path.isfile(self.target_filename(docname))
+                or self.manifest.changed(docname)
+            ):
+                outdated.append(docname)
+            else:
+                # the content didn't change, don't let sphinx read it again
+                self.env.all_docs[docname] = time.time()
+
+        return outdated
+
+    def document_files(self, docname, relations):
+        filenames = {self.env.doc2path(docname)}
+
+        for dependency in self.env.dependencies.get(docname, ()):
+            filenames.add(path.join(self.srcdir, dependency))
+
+        for neighbour in relations.get(docname, ()):
+            if neighbour:
+                filenames.add(self.env.doc2path(neighbour))
+
+        return filenames
 
     def get_target_uri(self, docname, typ=None) -> str:
         return ""
 
     def prepare_writing(self, docnames):
-        self.docwriter = HTMLWriter(self)
+        self.manifest.reset()
+        relations = get_relations(self.env)
+
+        for docname in docnames:
+            self.manifest.record(docname, self.document_files(docname, relations))
+
+        self.main_process = os.getpid()
+        self.pending_writes = []
+        self.targets = {}
+
+        for docname in docnames:
+            filename = self.target_filename(docname)
+            self.targets[filename] = file_signature(filename)
+
+        self.docwriter = MarkdownWriter(self)
         self.docsettings = OptionParser(
             defaults=self.env.settings,
-            components=(self.docwriter,),
+            components=(HTMLWriter(self),),
             read_config_files=True,
         ).get_default_values()
         self.docsettings.compact_lists = bool(self.config.html_compact_lists)
@@ -91,17 +102,40 @@ class VitePressBuilder(Builder):
         self.secnumbers = self.env.toc_secnumbers.get(docname, {})
         self.fignumbers = self.env.toc_fignumbers.get(docname, {})
 
-        self.docwriter.write(doctree, destination)
-        self.docwriter.assemble_parts()
-        body = self.docwriter.parts["fragment"]
+        body = self.docwriter.write(doctree, destination)
+
+        self.pending_writes.append((self.target_filename(docname), body))
 
-        outfilename = path.join(self.outdir, os_path(docname) + self.out_suffix)
-        ensuredir(path.dirname(outfilename))
-        try:
-            with open(outfilename, "w", encoding="utf-8") as f:
-                f.write(body)
-        except OSError:
-            pass
+        # parallel workers exit without notice so they can't keep a batch around
+        if (
+            len(self.pending_writes) >= self.batch_size
+            or os.getpid() != self.main_process
+        ):
+            self.flush()
+
+    def target_filename(self, docname):
+        return path.join(self.outdir, os_path(docname) + self.out_suffix)
+
+    def flush(self):
+        for filename, content in self.pending_writes:
+            try:
+                write_if_changed(filename, content)
+            except OSError:
+                pass
+
+        self.pending_writes.clear()
+
+    def write(self, *args, **kwargs):
+        super().write(*args, **kwargs)
+        self.flush()
 
     def finish(self):
-        pass
+        self.manifest.save(self.env.found_docs)
+
+        written = sum(
+            file_signature(filename) != signature
+            for filename, signature in self.targets.items()
+        )
+        skipped = len(self.targets) - written
+
+        logger.info(f"{written} files written, {skipped} unchanged")
@@ -1,13 +1,20 @@
+import asyncio
+import os
+from contextlib import contextmanager
 from functools import partial
 from itertools import chain
 from pathlib import Path
 from queue import Empty, Queue
-from threading import Timer
+from threading import Condition, Thread
+from time import monotonic
 from typing import NamedTuple
 
-from watchdog.events import PatternMatchingEventHandler
+from sphinx.util.matching import Matcher
+from watchdog.events import FileModifiedEvent, PatternMatchingEventHandler
 from watchdog.observers import Observer
 
+from .polling import SnapshotObserver
+
 
 class EventBatch(NamedTuple):
     moved: list
@@ -23,25 +30,26 @@ class EventBatch(NamedTuple):
 class EventHandler(PatternMatchingEventHandler):
     def __init__(
         self,
+        watcher,
+        root,
         patterns=None,
-        ignore_patterns=None,
         ignore_directories=False,
         case_sensitive=False,
-        output_directory=None,
     ):
         super().__init__(
             patterns=patterns,
-            ignore_patterns=ignore_patterns,
             ignore_directories=ignore_directories,
             case_sensitive=case_sensitive,
         )
-        self.output_directory = output_directory
+        self.watcher = watcher
+        self.root = root
 
     def dispatch(self, event):
-        if self.output_directory:
-            if path := getattr(event, "dest_path", getattr(event, "src_path", None)):
-                if path.startswith(self.output_directory):
-                    return
+        if path := getattr(event, "dest_path", getattr(event, "src_path", None)):
+            if self.watcher.ignored(self.root, path, event.is_directory):
+                return
+            if event.is_directory and event.event_type in ("created", "moved"):
+                self.watcher.directory_added(self, path)
         return super().dispatch(event)
 
 
@@ -54,11 +62,15 @@ class DirectoryWatcher:
         ignore_directories=False,
         case_sensitive=False,
         output_directory=None,
+        keep_directories=(),
         recursive=True,
         debounce_time=0.25,
         queue_timeout=2,
+        polling=False,
+        polling_interval=1,
     ):
         self.directories = set()
+        self.matchers = {}
         self.patterns = patterns
         self.ignore_patterns = ignore_patterns
         self.ignore_directories = ignore_directories
@@ -66,19 +78,27 @@ class DirectoryWatcher:
         self.output_directory = output_directory and str(
             Path(output_directory).resolve()
         )
+        self.keep_directories = [os.path.abspath(d) for d in keep_directories]
         self.recursive = recursive
         self.debounce_time = debounce_time
         self.queue_timeout = queue_timeout
+        self.polling = polling
+        self.polling_interval = polling_interval
 
         for directory in directories:
             self.watch(directory)
 
+        self.observer = None
+        self.listener = None
+        self.shallow = set()
         self.queue = Queue()
-        self.timer = None
-        self.moved, self.created, self.modified, self.deleted = [], [], [], []
+        self.condition = Condition()
+        self.scheduler = None
+        self.deadline = None
+        self.moved, self.created, self.modified, self.deleted = {}, {}, {}, {}
         self.created_paths = set()
 
-    def watch(self, directory):
+    def watch(self, directory, ignore_patterns=None):
         directory = Path(directory).absolute()
         subdirs = set()
 
@@ -91,68 +111,191 @@ class DirectoryWatcher:
         self.directories.add(directory)
         self.directories -= subdirs
 
-    def __iter__(self):
-        observer = Observer()
+        for subdir in subdirs:
+            self.matchers.pop(str(subdir), None)
+
+        if ignore_patterns is None:
+            ignore_patterns = self.ignore_patterns
+
+        # patterns are relative to the watched directory like sphinx's exclude_patterns
+        self.matchers[str(directory)] = Matcher(ignore_patterns or [])
+
+    def kept(self, path):
+        return any(
+            path == directory
+            or path.startswith(directory + os.sep)
+            or directory.startswith(path + os.sep)
+            for directory in self.keep_directories
+        )
+
+    def pruned(self, root, directory):
+        if self.output_directory and (
+            directory == self.output_directory
+            or directory.startswith(self.output_directory + os.sep)
+        ):
+            return True
+
+        if self.kept(directory):
+            return False
+
+        try:
+            parts = Path(directory).relative_to(root).parts
+        except ValueError:
+            return False
+
+        matcher = self.matchers[root]
+
+        return any(matcher("/".join(parts[: i + 1])) for i in range(len(parts)))
+
+    def ignored(self, root, path, is_directory=False):
+        if self.pruned(root, path if is_directory else os.path.dirname(path)):
+            return True
+
+        if is_directory or self.kept(path):
+            return False
+
+        try:
+            relative = Path(path).relative_to(root).as_posix()
+        except ValueError:
+            return False
+
+        return self.matchers[root](relative)
+
+    def schedule_plan(self, root, directory):
+        if not self.recursive:
+            return [(directory, False)]
+
+        try:
+            with os.scandir(directory) as entries:
+                subdirs = [e.path for e in entries if e.is_dir(follow_symlinks=False)]
+        except OSError:
+            return [(directory, True)]
+
+        children = [d for d in subdirs if not self.pruned(root, d)]
+        plans = [self.schedule_plan(root, child) for child in children]
+
+        # watch recursively unless an ignored directory would end up in the subtree
+        if len(children) == len(subdirs) and all(plan[0][1] for plan in plans):
+            return [(directory, True)]
+
+        return [(directory, False)] + [entry for plan in plans for entry in plan]
+
+    def add_watches(self, handler, directory):
+        for path, recursive in self.schedule_plan(handler.root, directory):
+            if not recursive:
+                self.shallow.add(path)
+            self.observer.schedule(handler, path, recursive)
+
+    def directory_added(self, handler, path):
+        if self.observer and os.path.dirname(path) in self.shallow:
+            self.add_watches(handler, path)
+
+    @contextmanager
+    def observe(self):
+        if self.polling:
+            observer = SnapshotObserver(self, self.polling_interval)
+        else:
+            observer = Observer()
+
+        self.observer = observer
+        self.shallow.clear()
 
         for directory in self.directories:
             handler = EventHandler(
+                self,
+                str(directory),
                 self.patterns,
-                self.ignore_patterns,
                 self.ignore_directories,
                 self.case_sensitive,
-                self.output_directory,
             )
             handler.on_moved = partial(self.callback, self.moved)
             handler.on_created = partial(self.callback, self.created)
             handler.on_modified = partial(self.callback, self.modified)
             handler.on_deleted = partial(self.callback, self.deleted)
 
-            observer.schedule(handler, str(directory), self.recursive)
+            self.add_watches(handler, str(directory))
 
         observer.start()
 
         try:
+            yield
+        finally:
+            observer.stop()
+            observer.join()
+            self.observer = None
+
+    def __iter__(self):
+        with self.observe():
             while True:
                 try:
                     yield self.queue.get(timeout=self.queue_timeout)
                 except Empty:
                     pass
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        # installed before the observer starts so that no batch goes to the
+        # synchronous queue, batches notified earlier are moved over
+        self.listener = partial(loop.call_soon_threadsafe, queue.put_nowait)
+
+        while not self.queue.empty():
+            queue.put_nowait(self.queue.get_nowait())
+
+        try:
+            with self.observe():
+                while True:
+                    yield await queue.get()
         finally:
-            observer.stop()
-            observer.join()
+            self.listener = None
+
+    def notify(self, path):
+        self.callback(self.modified, FileModifiedEvent(str(path)))
 
     def callback(self, category, event):
-        if self.timer:
-            self.timer.cancel()
+        path = event.src_path
 
-        if all(e.src_path != event.src_path for e in category):
-            category.append(event)
+        with self.condition:
+            if path not in category:
+                category[path] = event
 
-            if category is self.created:
-                self.created_paths.add(event.src_path)
+                if category is self.created:
+                    self.created_paths.add(path)
 
-            if category in (self.modified, self.deleted):
-                self.created[:] = [
-                    e for e in self.created if e.src_path != event.src_path
-                ]
-            if category is self.deleted:
-                self.modified[:] = [
-                    e for e in self.modified if e.src_path != event.src_path
-                ]
-                if event.src_path in self.created_paths:
-                    category.remove(event)
+                if category is self.modified or category is self.deleted:
+                    self.created.pop(path, None)
 
-        self.timer = Timer(self.debounce_time, self.debounced_callback)
-        self.timer.start()
+                if category is self.deleted:
+                    self.modified.pop(path, None)
+                    if path in self.created_paths:
+                        del category[path]
 
-    def debounced_callback(self):
-        self.timer = None
+            self.deadline = monotonic() + self.debounce_time
+
+            if not self.scheduler:
+                self.scheduler = Thread(target=self.schedule, daemon=True)
+                self.scheduler.start()
+
+            self.condition.notify()
 
+    def schedule(self):
+        with self.condition:
+            while True:
+                if self.deadline is None:
+                    self.condition.wait()
+                elif (remaining := self.deadline - monotonic()) > 0:
+                    self.condition.wait(remaining)
+                else:
+                    self.deadline = None
+                    self.debounced_callback()
+
+    def debounced_callback(self):
         event_batch = EventBatch(
-            list(self.moved),
-            list(self.created),
-            list(self.modified),
-            list(self.deleted),
+            list(self.moved.values()),
+            list(self.created.values()),
+            list(self.modified.values()),
+            list(self.deleted.values()),
         )
 
         self.moved.clear()
@@ -162,4 +305,4 @@ class DirectoryWatcher:
 
         self.created_paths.clear()
 
-        self.queue.put(event_batch)
+        (self.listener or self.queue.put)(event_batch)
@@ -0,0 +1,126 @@
+import sys
+from importlib import import_module
+from multiprocessing import get_all_start_methods, get_context
+from traceback import format_exc
+
+from .errors import MudkipError
+
+
+def fork_available():
+    return "fork" in get_all_start_methods()
+
+
+class Zygote:
+    def __init__(self, func, project_name=None, preload=()):
+        self.func = func
+        self.project_name = project_name
+        self.context = get_context("fork")
+        self.preloaded = set()
+        self.initial_preload = list(preload)
+        self.connection = None
+        self.process = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def start(self):
+        # the zygote is forked once, before the main process starts any thread,
+        # and it never starts threads itself so that forking it again is safe
+        self.connection, connection = self.context.Pipe()
+        self.process = self.context.Process(target=self.serve, args=(connection,))
+        self.process.start()
+        connection.close()
+
+    def close(self):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+
+        self.connection.close()
+        self.process.join()
+
+    def run(self, *args, **kwargs):
+        try:
+            self.connection.send((args, kwargs))
+            error, result = self.connection.recv()
+        except (EOFError, OSError):
+            raise MudkipError("The build process exited unexpectedly.") from None
+
+        if error:
+            raise MudkipError(error)
+
+        return result
+
+    def is_project_module(self, name):
+        return bool(self.project_name) and (
+            name == self.project_name or name.startswith(self.project_name + ".")
+        )
+
+    def preload(self, names):
+        for name in names:
+            if name in self.preloaded or self.is_project_module(name):
+                continue
+
+            self.preloaded.add(name)
+
+            try:
+                import_module(name)
+            except Exception:
+                pass
+
+    def serve(self, connection):
+        try:
+            self.preload(self.initial_preload)
+
+            while (request := connection.recv()) is not None:
+                args, kwargs = request
+                error, imported, result = self.fork(args, kwargs)
+                connection.send((error, result))
+                self.preload(imported)
+        except (EOFError, KeyboardInterrupt):
+            pass
+        finally:
+            connection.close()
+
+    def fork(self, args, kwargs):
+        receiver, sender = self.context.Pipe(duplex=False)
+        process = self.context.Process(target=self.child, args=(sender, args, kwargs))
+        process.start()
+        sender.close()
+
+        try:
+            return receiver.recv()
+        except EOFError:
+            return "The build process exited unexpectedly.", (), None
+        finally:
+            receiver.close()
+            process.join()
+
+    def child(self, sender, args, kwargs):
+        modules = set(sys.modules)
+        error = result = None
+
+        try:
+            result = self.func(*args, **kwargs)
+        except MudkipError as exc:
+            error = exc.args[0]
+        except Exception:
+            error = format_exc()
+
+        imported = {
+            name.partition(".")[0]
+            for name in set(sys.modules) - modules
+            if not self.is_project_module(name)
+        }
+
+        packages = sorted(
+            name for name in imported if hasattr(sys.modules.get(name), "__path__")
+        )
+
+        sender.send((error, packages, result))
+        sender.close()
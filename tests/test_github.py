@@ -0,0 +1,77 @@
+import subprocess
+
+import pytest
+
+from mudkip.github import GitHubPagesUpdater
+
+
+def git(*args, cwd):
+    return subprocess.run(
+        ["git", *args], check=True, cwd=cwd, capture_output=True, text=True
+    ).stdout.strip()
+
+
+@pytest.fixture(autouse=True)
+def git_identity(monkeypatch):
+    for role in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{role}_NAME", "Mudkip")
+        monkeypatch.setenv(f"GIT_{role}_EMAIL", "mudkip@example.com")
+
+
+@pytest.fixture
+def remote(tmp_path):
+    path = tmp_path / "remote.git"
+    git("init", "-q", "--bare", str(path), cwd=tmp_path)
+    return path
+
+
+@pytest.fixture
+def site(tmp_path):
+    path = tmp_path / "site"
+    (path / "nested").mkdir(parents=True)
+    (path / "index.html").write_text("<h1>Index</h1>")
+    (path / "nested" / "page.html").write_text("<h1>Page</h1>")
+    return path
+
+
+def remote_files(remote):
+    return set(git("ls-tree", "-r", "--name-only", "gh-pages", cwd=remote).split())
+
+
+def remote_commits(remote):
+    return git("rev-list", "gh-pages", cwd=remote).split()
+
+
+def test_incremental_deploy(tmp_path, remote, site):
+    updater = GitHubPagesUpdater(site, str(remote), tmp_path / "clone")
+
+    assert updater.update()
+    assert remote_files(remote) == {"index.html", "nested/page.html"}
+    first = remote_commits(remote)
+
+    assert not updater.update()
+    assert remote_commits(remote) == first
+
+    (site / "index.html").write_text("<h1>Updated</h1>")
+    (site / "nested" / "page.html").unlink()
+    (site / "other.html").write_text("<h1>Other</h1>")
+
+    assert updater.update()
+    assert remote_files(remote) == {"index.html", "other.html"}
+    assert git("show", "gh-pages:index.html", cwd=remote) == "<h1>Updated</h1>"
+    assert remote_commits(remote)[1:] == first
+
+
+def test_shallow_fresh_clone(tmp_path, remote, site):
+    assert GitHubPagesUpdater(site, str(remote), tmp_path / "first").update()
+    first = remote_commits(remote)
+
+    (site / "index.html").write_text("<h1>Updated</h1>")
+
+    updater = GitHubPagesUpdater(site, str(remote), tmp_path / "second", depth=1)
+
+    assert updater.update()
+    assert remote_commits(remote)[1:] == first
+    assert git("rev-parse", "--is-shallow-repository", cwd=tmp_path / "second") == (
+        "true"
+    )
@@ -0,0 +1,18 @@
+import json
+import subprocess
+import sys
+
+HEAVY_PACKAGES = {"sphinx", "docutils", "watchdog", "livereload"}
+
+
+def test_cli_import_is_lazy():
+    # in a fresh interpreter, the test session may have imported them already
+    script = "import json, sys, mudkip.cli; print(json.dumps(list(sys.modules)))"
+
+    output = subprocess.run(
+        [sys.executable, "-c", script], check=True, capture_output=True, text=True
+    ).stdout
+
+    loaded = {name.partition(".")[0] for name in json.loads(output)}
+
+    assert not loaded & HEAVY_PACKAGES
@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Thread
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class LinkHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        self.server.hits[self.path] += 1
+        self.send_response(200 if self.path == "/ok" else 404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = do_HEAD
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LinkHandler)
+    server.hits = Counter()
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    thread.join()
+
+
+@pytest.fixture
+def project(tmp_path, server):
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "index.rst").write_text(
+        f"Links\n=====\n\n`ok <{url}/ok>`_ and `missing <{url}/missing>`_\n"
+    )
+    (tmp_path / "mudkip.toml").write_text('[mudkip]\npreset = "alabaster"\n')
+    return tmp_path
+
+
+def check(project, *args):
+    return subprocess.run(
+        [sys.executable, "-m", "mudkip", "build", "--check", *args],
+        cwd=project,
+        env={**os.environ, "PYTHONPATH": str(ROOT), "NO_PROXY": "127.0.0.1"},
+        capture_output=True,
+        text=True,
+    )
+
+
+def test_cached_broken_link_fails(project, server):
+    result = check(project)
+    output = (result.stdout + result.stderr).splitlines()
+    assert result.returncode == 1
+    assert len([line for line in output if "/missing" in line]) == 1
+    assert server.hits["/ok"] and server.hits["/missing"]
+
+    server.hits.clear()
+
+    result = check(project)
+    assert result.returncode == 1
+    assert "Found 1 broken link." in result.stdout + result.stderr
+    assert not server.hits
+
+
+def test_recheck_links(project, server):
+    check(project)
+    server.hits.clear()
+
+    check(project, "--recheck-links")
+    assert server.hits["/ok"] and server.hits["/missing"]
+
+
+def test_ttl_per_status(project, server):
+    check(project)
+    server.hits.clear()
+
+    # older than the ttl of broken links but not the one of working links
+    cache_file = project / "docs" / "_build" / "link_cache.json"
+    entries = json.loads(cache_file.read_text())
+    for entry in entries.values():
+        entry["checked"] = time.time() - 2 * 3600
+    cache_file.write_text(json.dumps(entries))
+
+    check(project)
+    assert not server.hits["/ok"]
+    assert server.hits["/missing"]